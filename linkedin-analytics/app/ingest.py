@@ -18,7 +18,7 @@ import re
 from dataclasses import dataclass, field
 from datetime import date, datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import openpyxl
 from sqlalchemy.orm import Session
@@ -40,6 +40,11 @@ SHEET_TOP_POSTS = "TOP POSTS"
 SHEET_FOLLOWERS = "FOLLOWERS"
 SHEET_DEMOGRAPHICS = "DEMOGRAPHICS"
 
+# Post URL patterns: aggregate exports link activity URNs, per-post exports
+# link share URNs.
+_ACTIVITY_URL_RE = re.compile(r"urn:li:activity:(\d+)")
+_SHARE_OR_ACTIVITY_URL_RE = re.compile(r"urn:li:(?:share|activity):(\d+)")
+
 
 @dataclass
 class ParsedExport:
@@ -83,17 +88,18 @@ class DuplicateFileError(IngestError):
 def compute_file_hash(file_path: Path) -> str:
     """Compute SHA256 hash of a file for deduplication.
 
+    Stays on SHA256 so new uploads remain comparable with the file_hash
+    values already stored in the uploads table. hashlib.file_digest() runs
+    the read/update loop in C against OpenSSL's (SHA-NI accelerated) digest.
+
     Args:
         file_path: Path to the file.
 
     Returns:
         Hex-encoded SHA256 digest string.
     """
-    sha256 = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
 def validate_upload(file_path: Path) -> None:
@@ -108,13 +114,7 @@ def validate_upload(file_path: Path) -> None:
     if not file_path.exists():
         raise IngestError(f"File not found: {file_path}")
 
-    if file_path.stat().st_size == 0:
-        raise IngestError("Uploaded file is empty.")
-
-    if file_path.stat().st_size > MAX_FILE_SIZE_BYTES:
-        raise IngestError(
-            f"File exceeds maximum size of {MAX_FILE_SIZE_BYTES // (1024 * 1024)} MB."
-        )
+    validate_upload_size(file_path.stat().st_size)
 
     suffix = file_path.suffix.lower()
     if suffix not in ALLOWED_EXTENSIONS:
@@ -123,6 +123,24 @@ def validate_upload(file_path: Path) -> None:
         )
 
 
+def validate_upload_size(size: int) -> None:
+    """Validate the byte size of an upload, wherever its bytes are held.
+
+    Args:
+        size: Size of the upload in bytes.
+
+    Raises:
+        IngestError: If the upload is empty or larger than MAX_FILE_SIZE_BYTES.
+    """
+    if size == 0:
+        raise IngestError("Uploaded file is empty.")
+
+    if size > MAX_FILE_SIZE_BYTES:
+        raise IngestError(
+            f"File exceeds maximum size of {MAX_FILE_SIZE_BYTES // (1024 * 1024)} MB."
+        )
+
+
 def _safe_int(value: Any, default: int = 0) -> int:
     """Convert a value to int, returning default on failure."""
     if value is None:
@@ -168,7 +186,7 @@ def _extract_activity_id(url: str) -> str | None:
     """
     if not url:
         return None
-    match = re.search(r"urn:li:activity:(\d+)", str(url))
+    match = _ACTIVITY_URL_RE.search(str(url))
     return match.group(1) if match else None
 
 
@@ -176,17 +194,22 @@ def _load_workbook(file_path: Path) -> openpyxl.Workbook:
     """Load an Excel workbook using openpyxl with data_only mode.
 
     Must use read_only=False because LinkedIn exports have unreliable
-    dimension metadata (max_col=1 in read_only mode).
+    dimension metadata (max_col=1 in read_only mode). External links are
+    not loaded; only cached cell values are read.
     """
-    return openpyxl.load_workbook(file_path, read_only=False, data_only=True)
+    return openpyxl.load_workbook(file_path, read_only=False, data_only=True, keep_links=False)
+
 
+def _sheets_by_name(wb: openpyxl.Workbook) -> dict[str, Any]:
+    """Map normalised (stripped, upper-cased) sheet names to worksheets.
 
-def _get_sheet(wb: openpyxl.Workbook, name: str) -> Any | None:
-    """Get a worksheet by name (case-insensitive)."""
+    Built once per workbook so each sheet lookup is a dict hit. If two
+    sheets normalise to the same name, the first one wins.
+    """
+    sheets: dict[str, Any] = {}
     for sheet_name in wb.sheetnames:
-        if sheet_name.strip().upper() == name.upper():
-            return wb[sheet_name]
-    return None
+        sheets.setdefault(sheet_name.strip().upper(), wb[sheet_name])
+    return sheets
 
 
 def _parse_discovery_sheet(ws: Any, warnings: list[str]) -> dict[str, int]:
@@ -198,9 +221,7 @@ def _parse_discovery_sheet(ws: Any, warnings: list[str]) -> dict[str, int]:
       A3: "Members reached"       B3: 875
     """
     summary: dict[str, int] = {}
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, values_only=False):
-        label = row[0].value
-        value = row[1].value if len(row) > 1 else None
+    for label, value in ws.iter_rows(max_col=2, values_only=True):
         if label and value is not None:
             key = str(label).strip().upper()
             if key == "IMPRESSIONS":
@@ -218,33 +239,32 @@ def _parse_engagement_sheet(ws: Any, warnings: list[str]) -> list[dict]:
       Row 2+: date values with daily totals
     """
     records: list[dict] = []
-    header_row = None
+    header_found = False
 
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, values_only=False):
-        cells = [c.value for c in row]
-        if not cells or cells[0] is None:
+    # max_col pads short rows with None, so every row unpacks to 3 values.
+    for date_val, impressions_val, engagements_val in ws.iter_rows(
+        max_col=3, values_only=True
+    ):
+        if date_val is None:
             continue
 
         # Find the header row
-        if str(cells[0]).strip().upper() == "DATE":
-            header_row = [str(c).strip().upper() if c else "" for c in cells]
+        if str(date_val).strip().upper() == "DATE":
+            header_found = True
             continue
 
-        if header_row is None:
+        if not header_found:
             continue
 
-        row_date = _parse_date(cells[0])
+        row_date = _parse_date(date_val)
         if not row_date:
             continue
 
-        impressions = _safe_int(cells[1]) if len(cells) > 1 else 0
-        engagements = _safe_int(cells[2]) if len(cells) > 2 else 0
-
         records.append({
             "metric_date": row_date,
             "post_id": None,
-            "impressions": impressions,
-            "engagements": engagements,
+            "impressions": _safe_int(impressions_val),
+            "engagements": _safe_int(engagements_val),
         })
 
     return records
@@ -266,21 +286,23 @@ def _parse_top_posts_sheet(ws: Any, warnings: list[str]) -> list[dict]:
     records_by_url: dict[str, dict[str, Any]] = {}
     data_started = False
 
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, values_only=False):
-        cells = [c.value for c in row]
+    for (
+        url_left_val, date_left_val, engagements_val, _gap,
+        url_right_val, date_right_val, impressions_val,
+    ) in ws.iter_rows(max_col=7, values_only=True):
 
         # Find the header row (contains "Post URL")
         if not data_started:
-            if cells[0] and str(cells[0]).strip().upper() == "POST URL":
+            if url_left_val and str(url_left_val).strip().upper() == "POST URL":
                 data_started = True
             continue
 
         # Left table: engagement data (cols A-C)
-        url_left = str(cells[0]).strip() if cells[0] else ""
+        url_left = str(url_left_val).strip() if url_left_val else ""
         if url_left and url_left.startswith("http"):
             activity_id = _extract_activity_id(url_left)
-            pub_date = _parse_date(cells[1]) if len(cells) > 1 else None
-            engagements = _safe_int(cells[2]) if len(cells) > 2 else 0
+            pub_date = _parse_date(date_left_val)
+            engagements = _safe_int(engagements_val)
 
             if activity_id and pub_date:
                 if activity_id not in records_by_url:
@@ -294,25 +316,24 @@ def _parse_top_posts_sheet(ws: Any, warnings: list[str]) -> list[dict]:
                 else:
                     records_by_url[activity_id]["engagements"] = engagements
 
-        # Right table: impressions data (cols E-G, index 4-6)
-        if len(cells) > 4:
-            url_right = str(cells[4]).strip() if cells[4] else ""
-            if url_right and url_right.startswith("http"):
-                activity_id = _extract_activity_id(url_right)
-                pub_date = _parse_date(cells[5]) if len(cells) > 5 else None
-                impressions = _safe_int(cells[6]) if len(cells) > 6 else 0
-
-                if activity_id and pub_date:
-                    if activity_id not in records_by_url:
-                        records_by_url[activity_id] = {
-                            "linkedin_post_id": activity_id,
-                            "post_url": url_right,
-                            "post_date": pub_date,
-                            "impressions": impressions,
-                            "engagements": 0,
-                        }
-                    else:
-                        records_by_url[activity_id]["impressions"] = impressions
+        # Right table: impressions data (cols E-G)
+        url_right = str(url_right_val).strip() if url_right_val else ""
+        if url_right and url_right.startswith("http"):
+            activity_id = _extract_activity_id(url_right)
+            pub_date = _parse_date(date_right_val)
+            impressions = _safe_int(impressions_val)
+
+            if activity_id and pub_date:
+                if activity_id not in records_by_url:
+                    records_by_url[activity_id] = {
+                        "linkedin_post_id": activity_id,
+                        "post_url": url_right,
+                        "post_date": pub_date,
+                        "impressions": impressions,
+                        "engagements": 0,
+                    }
+                else:
+                    records_by_url[activity_id]["impressions"] = impressions
 
     # Convert to post records
     posts: list[dict] = []
@@ -351,16 +372,15 @@ def _parse_followers_sheet(ws: Any, warnings: list[str]) -> list[dict]:
     total_followers: int = 0
     header_found = False
 
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, values_only=False):
-        cells = [c.value for c in row]
-        if not cells or cells[0] is None:
+    for label_val, count_val in ws.iter_rows(max_col=2, values_only=True):
+        if label_val is None:
             continue
 
-        label = str(cells[0]).strip()
+        label = str(label_val).strip()
 
         # Extract total followers from row 1
         if label.upper().startswith("TOTAL FOLLOWERS"):
-            total_followers = _safe_int(cells[1]) if len(cells) > 1 else 0
+            total_followers = _safe_int(count_val)
             continue
 
         # Find the header row
@@ -371,11 +391,11 @@ def _parse_followers_sheet(ws: Any, warnings: list[str]) -> list[dict]:
         if not header_found:
             continue
 
-        row_date = _parse_date(cells[0])
+        row_date = _parse_date(label_val)
         if not row_date:
             continue
 
-        new_followers = _safe_int(cells[1]) if len(cells) > 1 else 0
+        new_followers = _safe_int(count_val)
 
         records.append({
             "snapshot_date": row_date,
@@ -402,12 +422,11 @@ def _parse_demographics_sheet(ws: Any, warnings: list[str]) -> list[dict]:
     snapshot_date = date.today()
     header_found = False
 
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, values_only=False):
-        cells = [c.value for c in row]
-        if not cells or cells[0] is None:
+    for label_val, value_val, pct_val in ws.iter_rows(max_col=3, values_only=True):
+        if label_val is None:
             continue
 
-        label = str(cells[0]).strip()
+        label = str(label_val).strip()
 
         # Skip the header row
         if label.upper() in ("TOP DEMOGRAPHICS", "CATEGORY"):
@@ -418,8 +437,8 @@ def _parse_demographics_sheet(ws: Any, warnings: list[str]) -> list[dict]:
             continue
 
         category = label.lower()
-        value = str(cells[1]).strip() if len(cells) > 1 and cells[1] else ""
-        pct = _safe_float(cells[2]) if len(cells) > 2 else 0.0
+        value = str(value_val).strip() if value_val else ""
+        pct = _safe_float(pct_val)
 
         if not value:
             continue
@@ -450,7 +469,11 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
         IngestError: If the file cannot be parsed.
     """
     validate_upload(file_path)
+    return _parse_validated_export(file_path)
+
 
+def _parse_validated_export(file_path: Path) -> ParsedExport:
+    """Parse an export file that has already passed validate_upload()."""
     result = ParsedExport()
 
     # CSV files are accepted but cannot be parsed as LinkedIn exports
@@ -464,16 +487,16 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
     except Exception as exc:
         raise IngestError(f"Failed to read file '{file_path.name}': {exc}") from exc
 
-    sheet_names = [s.strip().upper() for s in wb.sheetnames]
-    logger.info("Loaded sheets: %s", sorted(sheet_names))
+    sheets = _sheets_by_name(wb)
+    logger.info("Loaded sheets: %s", sorted(sheets))
 
-    if not sheet_names:
+    if not sheets:
         wb.close()
         raise IngestError("No sheets found in file.")
 
     try:
         # DISCOVERY sheet -> summary metrics (stored as info, not daily rows)
-        ws = _get_sheet(wb, SHEET_DISCOVERY)
+        ws = sheets.get(SHEET_DISCOVERY)
         if ws:
             summary = _parse_discovery_sheet(ws, result.warnings)
             if summary:
@@ -482,7 +505,7 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
             result.warnings.append(f"Sheet '{SHEET_DISCOVERY}' not found.")
 
         # ENGAGEMENT sheet -> daily account-level metrics
-        ws = _get_sheet(wb, SHEET_ENGAGEMENT)
+        ws = sheets.get(SHEET_ENGAGEMENT)
         if ws:
             result.daily_metrics.extend(
                 _parse_engagement_sheet(ws, result.warnings)
@@ -491,7 +514,7 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
             result.warnings.append(f"Sheet '{SHEET_ENGAGEMENT}' not found.")
 
         # TOP POSTS sheet -> individual post records with URLs
-        ws = _get_sheet(wb, SHEET_TOP_POSTS)
+        ws = sheets.get(SHEET_TOP_POSTS)
         if ws:
             result.posts.extend(
                 _parse_top_posts_sheet(ws, result.warnings)
@@ -500,7 +523,7 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
             result.warnings.append(f"Sheet '{SHEET_TOP_POSTS}' not found.")
 
         # FOLLOWERS sheet -> follower snapshots
-        ws = _get_sheet(wb, SHEET_FOLLOWERS)
+        ws = sheets.get(SHEET_FOLLOWERS)
         if ws:
             result.follower_snapshots.extend(
                 _parse_followers_sheet(ws, result.warnings)
@@ -509,7 +532,7 @@ def parse_linkedin_export(file_path: Path) -> ParsedExport:
             result.warnings.append(f"Sheet '{SHEET_FOLLOWERS}' not found.")
 
         # DEMOGRAPHICS sheet -> demographic snapshots
-        ws = _get_sheet(wb, SHEET_DEMOGRAPHICS)
+        ws = sheets.get(SHEET_DEMOGRAPHICS)
         if ws:
             result.demographic_snapshots.extend(
                 _parse_demographics_sheet(ws, result.warnings)
@@ -573,7 +596,7 @@ def _upsert_post(session: Session, record: dict[str, Any]) -> Post:
             existing.post_url = record["post_url"]
         if record.get("post_type") and not existing.post_type:
             existing.post_type = record["post_type"]
-        existing.recalculate_engagement_rate()
+        # engagement_rate is recalculated in bulk by load_to_db after the flush.
         # Transition status: if the post was published via the API and now has analytics, mark as linked
         if existing.status == "published" and existing.content:
             existing.status = "analytics_linked"
@@ -699,9 +722,10 @@ def load_to_db(session: Session, parsed: ParsedExport) -> ImportStats:
     stats = ImportStats(warnings=list(parsed.warnings))
 
     # Upsert posts
+    upserted_posts: list[Post] = []
     for record in parsed.posts:
         try:
-            _upsert_post(session, record)
+            upserted_posts.append(_upsert_post(session, record))
             stats.posts_upserted += 1
         except Exception as exc:
             msg = f"Failed to upsert post (date={record.get('post_date')}): {exc}"
@@ -710,6 +734,10 @@ def load_to_db(session: Session, parsed: ParsedExport) -> ImportStats:
 
     session.flush()  # Ensure post IDs are available for daily metrics
 
+    # Recompute engagement rates for every upserted post in a single UPDATE.
+    if upserted_posts:
+        Post.bulk_recalculate_engagement_rates(session, [p.id for p in upserted_posts])
+
     # Upsert daily account-level metrics (post_id=None)
     for record in parsed.daily_metrics:
         try:
@@ -774,6 +802,23 @@ def _detect_xlsx_format(wb: openpyxl.Workbook) -> str:
     return "unknown"
 
 
+def _detect_file_format(file_path: Path | BinaryIO) -> str:
+    """Detect the XLSX export format of a file without parsing its sheets.
+
+    Opens the workbook in read_only mode, which reads the sheet list but
+    defers the worksheet XML. The dimension caveat in _load_workbook does
+    not apply to sheet names.
+
+    Returns:
+        Same values as _detect_xlsx_format.
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, keep_links=False)
+    try:
+        return _detect_xlsx_format(wb)
+    finally:
+        wb.close()
+
+
 def _parse_per_post_performance(ws: Any) -> dict[str, str]:
     """Parse key-value pairs from the PERFORMANCE sheet.
 
@@ -820,7 +865,7 @@ def _extract_urn_from_url(url: str) -> str | None:
 
     Handles URLs containing urn:li:share:{id} or urn:li:activity:{id}.
     """
-    match = re.search(r"urn:li:(?:share|activity):(\d+)", url)
+    match = _SHARE_OR_ACTIVITY_URL_RE.search(url)
     return match.group(1) if match else None
 
 
@@ -855,7 +900,9 @@ def _parse_per_post_demographics(ws: Any) -> list[dict[str, Any]]:
     return rows
 
 
-def ingest_per_post_xlsx(session: Session, wb: openpyxl.Workbook) -> dict[str, Any]:
+def ingest_per_post_xlsx(
+    session: Session, wb: openpyxl.Workbook, commit: bool = True
+) -> dict[str, Any]:
     """Ingest a per-post XLSX export.
 
     Extracts metrics, post_hour, linkedin_post_id, and demographics
@@ -864,19 +911,16 @@ def ingest_per_post_xlsx(session: Session, wb: openpyxl.Workbook) -> dict[str, A
     Args:
         session: SQLAlchemy session.
         wb: Open openpyxl workbook (must contain PERFORMANCE and TOP DEMOGRAPHICS sheets).
+        commit: Commit before returning. Callers that record an Upload row
+            for the file pass False and commit both in one transaction.
 
     Returns:
         Dict with import results: post_id, linkedin_post_id, metrics_updated, demographics_imported.
     """
     # Find sheets case-insensitively
-    perf_ws = None
-    demo_ws = None
-    for sheet_name in wb.sheetnames:
-        upper = sheet_name.strip().upper()
-        if upper == "PERFORMANCE":
-            perf_ws = wb[sheet_name]
-        elif upper == "TOP DEMOGRAPHICS":
-            demo_ws = wb[sheet_name]
+    sheets = _sheets_by_name(wb)
+    perf_ws = sheets.get("PERFORMANCE")
+    demo_ws = sheets.get("TOP DEMOGRAPHICS")
 
     if perf_ws is None:
         raise IngestError("Per-post XLSX is missing the PERFORMANCE sheet.")
@@ -996,7 +1040,10 @@ def ingest_per_post_xlsx(session: Session, wb: openpyxl.Workbook) -> dict[str, A
             )
             demo_count += 1
 
-    session.commit()
+    if commit:
+        session.commit()
+    else:
+        session.flush()
 
     return {
         "post_id": post.id,
@@ -1025,6 +1072,9 @@ def ingest_file(
         DuplicateFileError: If the file has already been imported.
         IngestError: If ingestion fails for any other reason.
     """
+    # Reject invalid files before paying for the hash and the dedup query.
+    validate_upload(file_path)
+
     # File-level deduplication via SHA256
     file_hash = compute_file_hash(file_path)
     existing_upload = session.query(Upload).filter_by(file_hash=file_hash).first()
@@ -1037,16 +1087,14 @@ def ingest_file(
     # Auto-detect format for XLSX files
     if file_path.suffix.lower() in (".xlsx", ".xls"):
         try:
-            wb = _load_workbook(file_path)
-            fmt = _detect_xlsx_format(wb)
-            wb.close()
+            fmt = _detect_file_format(file_path)
         except Exception:
             fmt = "aggregate"  # Fall through to standard parser on error
 
         if fmt == "per_post":
             try:
                 wb = _load_workbook(file_path)
-                per_post_result = ingest_per_post_xlsx(session, wb)
+                per_post_result = ingest_per_post_xlsx(session, wb, commit=False)
                 wb.close()
             except Exception as exc:
                 raise IngestError(f"Per-post XLSX ingest failed: {exc}") from exc
@@ -1064,7 +1112,7 @@ def ingest_file(
             stats = ImportStats(posts_upserted=1)
             return upload, stats
 
-    parsed = parse_linkedin_export(file_path)
+    parsed = _parse_validated_export(file_path)
     stats = load_to_db(session, parsed)
 
     upload = Upload(
@@ -10,19 +10,31 @@ Follows the linkedin-api-architect design principles:
 - Rate limit headers logged
 - API version pinned in config
 
-IMPORTANT: All functions in this module are async. They use httpx.AsyncClient
-to avoid blocking the FastAPI event loop.
+IMPORTANT: All functions in this module are async. They share one
+module-level httpx.AsyncClient (see _get_client) so keep-alive connections
+to api.linkedin.com are reused across calls instead of paying a fresh
+TCP + TLS handshake per request. The client negotiates HTTP/2, so concurrent
+calls multiplex over a single connection. The client is closed by aclose() from the
+FastAPI lifespan on shutdown.
 
 Phase 0 note: If /rest/posts returns 403, fall back to /v2/ugcPosts using
 the ugc_post payload format. Set USE_UGC_POSTS=true in the environment to
 switch endpoints without code changes.
 """
 
+import asyncio
+import hashlib
 import logging
+import random
 import re
+import time
+from collections.abc import Mapping
 from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
 
 import httpx
+import orjson
 
 from app.config import settings
 
@@ -37,6 +49,49 @@ _USERINFO_URL = "https://api.linkedin.com/v2/userinfo"
 # LinkedIn post character limit
 MAX_POST_LENGTH = 3000
 
+# Matches the numeric ID in share, ugcPost, and activity URNs.
+_ACTIVITY_URN_RE = re.compile(r"urn:li:(?:share|ugcPost|activity):(\d+)")
+
+# Pulls the "sub" claim straight out of the /userinfo body. Values containing
+# JSON escapes do not match and fall back to a full orjson decode.
+_SUB_RE = re.compile(rb'"sub"\s*:\s*"([^"\\]*)"')
+
+# Connection pool limits for the shared client.
+_CLIENT_LIMITS = httpx.Limits(
+    max_keepalive_connections=20,
+    max_connections=100,
+    keepalive_expiry=300,
+)
+
+# Request timeouts, built once. Connect is capped separately so slow DNS/TCP
+# setup fails fast (and is retried) instead of consuming the full read budget.
+_POST_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+_USERINFO_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Shared async client, created lazily on first use and closed by aclose().
+_client: httpx.AsyncClient | None = None
+
+# Retry policy for POST /rest/posts. Only responses that guarantee the post was
+# not created are retried (429, 503, connect timeout); any other 4xx/5xx fails
+# immediately.
+_MAX_ATTEMPTS = 3
+_RETRYABLE_STATUSES = frozenset({429, 503})
+
+# Escalating retry delays (seconds) used when LinkedIn sends no Retry-After:
+# short first waits let quickly-recovering calls return fast, later waits
+# back off harder. Attempts past the end of the table reuse the last entry.
+_POLL_DELAYS = (0.2, 0.5, 1.0, 2.0, 5.0)
+_POLL_JITTER = 0.25  # +/- fraction applied to each delay
+
+# Longest Retry-After we will sleep through inside a request. Longer waits are
+# surfaced to the caller as LinkedInRateLimitError instead.
+_MAX_RETRY_AFTER_SECONDS = 10
+
+# Circuit breaker policy for publishing: consecutive failed publishes (after
+# retries) before the breaker opens, and seconds it stays open.
+_BREAKER_FAIL_THRESHOLD = 5
+_BREAKER_RESET_SECONDS = 30
+
 
 class LinkedInAPIError(Exception):
     """Raised when a LinkedIn API call fails. Message is sanitized."""
@@ -50,6 +105,40 @@ class LinkedInRateLimitError(LinkedInAPIError):
         self.retry_after_seconds = retry_after_seconds
 
 
+class _CircuitBreaker:
+    """Fail fast while LinkedIn is down instead of adding load to an outage.
+
+    Opens after fail_threshold consecutive failures (5xx, 429, or network
+    errors). While open, callers are rejected without a request being sent.
+    Once reset_timeout seconds have passed it is half-open: the next call goes
+    through, a success closes the breaker, and a failure re-opens it at once.
+    """
+
+    def __init__(self, fail_threshold: int, reset_timeout: float) -> None:
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        if self._opened_at is None:
+            return False
+        return time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self.fail_threshold:
+            self._opened_at = time.monotonic()
+
+
+_breaker = _CircuitBreaker(_BREAKER_FAIL_THRESHOLD, _BREAKER_RESET_SECONDS)
+
+
 @dataclass
 class PublishResult:
     """Result from publishing a post to LinkedIn."""
@@ -59,14 +148,56 @@ class PublishResult:
     post_url: str       # Constructed LinkedIn post URL
 
 
-def _build_headers(access_token: str) -> dict[str, str]:
-    """Build the required headers for LinkedIn REST API calls."""
-    return {
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=_POST_TIMEOUT,
+            limits=_CLIENT_LIMITS,
+        )
+    return _client
+
+
+async def aclose() -> None:
+    """Close the shared AsyncClient. Called from the FastAPI lifespan on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@lru_cache(maxsize=4)
+def _cached_headers(access_token: str, api_version: str) -> Mapping[str, str]:
+    """Build the REST headers once per (token, API version) pair.
+
+    Returns a read-only view so the shared cached mapping cannot be mutated
+    by callers.
+    """
+    return MappingProxyType({
         "Authorization": f"Bearer {access_token}",
-        "LinkedIn-Version": settings.linkedin_api_version,
+        "LinkedIn-Version": api_version,
         "X-Restli-Protocol-Version": "2.0.0",
         "Content-Type": "application/json",
-    }
+    })
+
+
+def _build_headers(access_token: str) -> Mapping[str, str]:
+    """Return the required headers for LinkedIn REST API calls.
+
+    The mapping is memoized for the lifetime of the access token; see
+    clear_header_cache().
+    """
+    return _cached_headers(access_token, settings.linkedin_api_version)
+
+
+def clear_header_cache() -> None:
+    """Drop memoized headers (and the plaintext tokens they hold).
+
+    Called by app.oauth whenever tokens are stored or revoked.
+    """
+    _cached_headers.cache_clear()
 
 
 def _log_rate_limits(response: httpx.Response) -> None:
@@ -77,6 +208,61 @@ def _log_rate_limits(response: httpx.Response) -> None:
         logger.info("LinkedIn rate limits: %s/%s remaining", remaining, limit)
 
 
+def _parse_retry_after(response: httpx.Response) -> int | None:
+    """Return the Retry-After header in whole seconds, or None if absent/non-numeric."""
+    retry_after = response.headers.get("Retry-After")
+    return int(retry_after) if retry_after and retry_after.isdigit() else None
+
+
+def _poll_delay(attempt: int) -> float:
+    """Escalating retry delay for the given 0-based attempt, with +/-25% jitter."""
+    base = _POLL_DELAYS[min(attempt, len(_POLL_DELAYS) - 1)]
+    return base * random.uniform(1 - _POLL_JITTER, 1 + _POLL_JITTER)
+
+
+async def _post_with_retries(
+    url: str,
+    payload: dict,
+    headers: Mapping[str, str],
+) -> httpx.Response:
+    """POST to LinkedIn, retrying transient failures with escalating delays.
+
+    Returns the last response (successful or not) so the caller can map its
+    status. Connect timeouts on the final attempt propagate unchanged. The
+    payload is serialized once with orjson and the same bytes are resent on
+    each attempt; Content-Type comes from the shared REST headers.
+    """
+    body = orjson.dumps(payload)
+    for attempt in range(_MAX_ATTEMPTS):
+        is_last = attempt == _MAX_ATTEMPTS - 1
+        try:
+            response = await _get_client().post(url, content=body, headers=headers)
+        except httpx.ConnectTimeout:
+            if is_last:
+                raise
+            logger.warning("LinkedIn connect timeout on %s; retrying", url)
+            await asyncio.sleep(_poll_delay(attempt))
+            continue
+
+        _log_rate_limits(response)
+        if is_last or response.status_code not in _RETRYABLE_STATUSES:
+            return response
+
+        retry_after = _parse_retry_after(response)
+        if retry_after is not None and retry_after > _MAX_RETRY_AFTER_SECONDS:
+            return response
+        delay = retry_after if retry_after is not None else _poll_delay(attempt)
+        logger.warning(
+            "LinkedIn returned %d on %s; retrying in %.1fs",
+            response.status_code,
+            url,
+            delay,
+        )
+        await asyncio.sleep(delay)
+
+    return response
+
+
 def _extract_activity_id(urn: str) -> str | None:
     """Extract the numeric activity/share ID from a LinkedIn URN.
 
@@ -85,7 +271,7 @@ def _extract_activity_id(urn: str) -> str | None:
     - urn:li:ugcPost:6844785523593134080
     - urn:li:activity:6844785523593134080
     """
-    match = re.search(r"urn:li:(?:share|ugcPost|activity):(\d+)", urn)
+    match = _ACTIVITY_URN_RE.search(urn)
     return match.group(1) if match else None
 
 
@@ -131,70 +317,84 @@ def _build_ugc_payload(
     }
 
 
+# Publish endpoints in the order they are tried, with their payload builders.
+_PUBLISH_ENDPOINTS = (
+    (_POSTS_URL, _build_rest_payload),
+    (_UGCPOSTS_URL, _build_ugc_payload),
+)
+
+
 async def create_post(
     access_token: str,
     member_urn: str,
     text: str,
     visibility: str = "PUBLIC",
+    idempotency_key: str | None = None,
 ) -> PublishResult:
     """Publish a text-only post to LinkedIn.
 
     Attempts /rest/posts first. If that endpoint returns 403 (access denied),
     retries with the legacy /v2/ugcPosts endpoint using the ugcPost payload.
+    429/503 responses and connect timeouts are retried with escalating,
+    jittered delays (see _post_with_retries) before an error is raised.
+    Repeated 5xx/429/network failures open a circuit breaker, after which
+    calls fail immediately until the cool-down passes.
 
     Args:
         access_token: Valid OAuth access token.
         member_urn: Author URN (e.g., "urn:li:person:abc123").
         text: Post body text (max 3000 characters).
         visibility: Post visibility ("PUBLIC" or "CONNECTIONS").
+        idempotency_key: Sent as the Idempotency-Key header on every attempt.
+            Defaults to a digest of (member_urn, text), so retries and repeat
+            submissions of the same post carry the same key.
 
     Returns:
         PublishResult with the post URN, activity ID, and URL.
 
     Raises:
-        LinkedInAPIError: On any API error (sanitized message).
-        LinkedInRateLimitError: On 429 with retry_after_seconds if available.
+        LinkedInAPIError: On any API error (sanitized message), or without a
+            request while the circuit breaker is open.
+        LinkedInRateLimitError: On 429 after retries are exhausted, with
+            retry_after_seconds if available.
         ValueError: If text is empty or exceeds MAX_POST_LENGTH.
     """
-    if not text or not text.strip():
-        raise ValueError("Post text cannot be empty.")
     if len(text) > MAX_POST_LENGTH:
         raise ValueError(
             f"Post text exceeds {MAX_POST_LENGTH} characters ({len(text)})."
         )
+    if not text or text.isspace():
+        raise ValueError("Post text cannot be empty.")
 
-    headers = _build_headers(access_token)
+    if _breaker.is_open:
+        logger.warning("LinkedIn circuit breaker open; rejecting publish")
+        raise LinkedInAPIError("LinkedIn is temporarily unavailable. Try again shortly.")
 
-    # Try /rest/posts first, fall back to /v2/ugcPosts on 403
-    endpoints_and_payloads = [
-        (_POSTS_URL, _build_rest_payload(member_urn, text, visibility)),
-        (_UGCPOSTS_URL, _build_ugc_payload(member_urn, text, visibility)),
-    ]
+    if idempotency_key is None:
+        idempotency_key = hashlib.blake2b(
+            f"{member_urn}|{text}".encode(), digest_size=16
+        ).hexdigest()
+    headers = {**_build_headers(access_token), "Idempotency-Key": idempotency_key}
 
     last_error: LinkedInAPIError | None = None
 
-    for url, payload in endpoints_and_payloads:
+    # Try /rest/posts first, fall back to /v2/ugcPosts on 403. Payloads are
+    # built per attempt so the legacy one is only constructed on fallback.
+    for url, build_payload in _PUBLISH_ENDPOINTS:
+        payload = build_payload(member_urn, text, visibility)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=httpx.Timeout(15.0),
-                )
-            _log_rate_limits(response)
+            response = await _post_with_retries(url, payload, headers)
             response.raise_for_status()
         except httpx.HTTPStatusError as e:
             status = e.response.status_code
             logger.error("LinkedIn Posts API %s returned status %d", url, status)
+            if status == 429 or status >= 500:
+                _breaker.record_failure()
+            else:
+                _breaker.record_success()
 
             if status == 429:
-                retry_after = e.response.headers.get("Retry-After")
-                retry_seconds = (
-                    int(retry_after)
-                    if retry_after and retry_after.isdigit()
-                    else None
-                )
+                retry_seconds = _parse_retry_after(e.response)
                 raise LinkedInRateLimitError(
                     f"Rate limited by LinkedIn. Try again in {retry_seconds or 'a few'} seconds.",
                     retry_after_seconds=retry_seconds,
@@ -212,12 +412,14 @@ async def create_post(
             ) from None
 
         except httpx.HTTPError:
+            _breaker.record_failure()
             logger.error("LinkedIn Posts API call failed: network error")
             raise LinkedInAPIError(
                 "Network error while publishing to LinkedIn"
             ) from None
         else:
             # Successful response
+            _breaker.record_success()
             post_urn = response.headers.get("x-restli-id", "")
             if not post_urn:
                 logger.error("LinkedIn did not return x-restli-id header")
@@ -267,15 +469,16 @@ async def get_member_id(access_token: str) -> str | None:
         "Authorization": f"Bearer {access_token}",
     }
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                _USERINFO_URL,
-                headers=headers,
-                timeout=httpx.Timeout(10.0),
-            )
+        response = await _get_client().get(
+            _USERINFO_URL,
+            headers=headers,
+            timeout=_USERINFO_TIMEOUT,
+        )
         response.raise_for_status()
-        data = response.json()
-        return data.get("sub")
+        match = _SUB_RE.search(response.content)
+        if match:
+            return match.group(1).decode()
+        return orjson.loads(response.content).get("sub")
     except (httpx.HTTPError, KeyError, ValueError) as e:
         logger.warning(
             "Failed to fetch member ID from /userinfo: %s", type(e).__name__
@@ -11,11 +11,14 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
-from fastapi import FastAPI
+from anyio import to_thread
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from app import linkedin_client, oauth
 from app.config import settings, validate_redirect_uri
-from app.database import init_db
+from app.database import init_db, session_scope
 from app.routes.api import router as api_router
 from app.routes.dashboard import router as dashboard_router
 from app.routes.oauth_routes import router as oauth_router
@@ -42,7 +45,7 @@ STATIC_DIR = Path(__file__).parent / "static"
 
 @asynccontextmanager
 async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
-    """Application lifespan: initialize database on startup."""
+    """Application lifespan: initialize database on startup, close HTTP clients on shutdown."""
     logger.info("Starting LinkedIn Analytics Dashboard on port %s", settings.app_port)
     import app.database as db_module
     init_db(db_module.engine)
@@ -55,9 +58,33 @@ async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
         logger.info("LinkedIn OAuth not configured. Running in manual-upload mode.")
 
     yield
+    await linkedin_client.aclose()
+    oauth.close_http_client()
     logger.info("Shutting down LinkedIn Analytics Dashboard.")
 
 
+def _load_oauth_connected() -> bool:
+    """Return whether a usable LinkedIn token is stored.
+
+    Runs blocking SQLite I/O, so callers on the event loop must offload it
+    to a worker thread.
+    """
+    with session_scope() as db:
+        return oauth.get_auth_status(db).connected
+
+
+async def inject_oauth_status(request: Request) -> None:
+    """Dependency: expose OAuth connection status to base.html via request.state.
+
+    Attached only to the routers that render HTML pages, so static assets and
+    JSON API calls never query the token table. The status query is
+    synchronous SQLite I/O and runs in the threadpool so it does not stall
+    the event loop.
+    """
+    if settings.oauth_enabled:
+        request.state.oauth_connected = await to_thread.run_sync(_load_oauth_connected)
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     application = FastAPI(
@@ -67,28 +94,18 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         redoc_url="/redoc",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
-    # Middleware: inject OAuth connection status into request.state for base.html sidebar.
-    @application.middleware("http")
-    async def inject_oauth_status(request, call_next):
-        if settings.oauth_enabled:
-            from app.database import session_scope
-            from app.oauth import get_auth_status
-
-            with session_scope() as db:
-                status = get_auth_status(db)
-                request.state.oauth_connected = status.connected
-        response = await call_next(request)
-        return response
-
     # Mount static files
     application.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-    # Include routers
-    application.include_router(dashboard_router)
+    # Include routers. Only the HTML routers render base.html and need the
+    # sidebar's OAuth status.
+    html_dependencies = [Depends(inject_oauth_status)]
+    application.include_router(dashboard_router, dependencies=html_dependencies)
     application.include_router(api_router)
-    application.include_router(upload_router)
+    application.include_router(upload_router, dependencies=html_dependencies)
     application.include_router(oauth_router)
 
     return application
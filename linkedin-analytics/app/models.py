@@ -1,20 +1,25 @@
 """SQLAlchemy ORM models for the LinkedIn analytics database."""
 
 from datetime import date, datetime
+from functools import lru_cache
 
 from sqlalchemy import (
-    Column,
     Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    case,
     func,
+    text,
+    update,
 )
-from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship
 
 
 class Base(DeclarativeBase):
@@ -24,46 +29,58 @@ class Base(DeclarativeBase):
 class Post(Base):
     __tablename__ = "posts"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    linkedin_post_id: str | None = Column(String, unique=True, nullable=True)
-    post_url: str | None = Column(String, nullable=True)
-    draft_id: str | None = Column(String(20), nullable=True)
-    title: str | None = Column(String(100), nullable=True)
-    post_date: date = Column(Date, nullable=False)
-    post_type: str | None = Column(String, nullable=True)
-    impressions: int = Column(Integer, default=0)
-    members_reached: int = Column(Integer, default=0)
-    reactions: int = Column(Integer, default=0)
-    comments: int = Column(Integer, default=0)
-    shares: int = Column(Integer, default=0)
-    clicks: int = Column(Integer, default=0)
-    engagement_rate: float = Column(Float, default=0.0)
-    topic: str | None = Column(String(50), nullable=True)
-    content_format: str | None = Column("content_format", String(30), nullable=True)
-    hook_style: str | None = Column(String(30), nullable=True)
-    length_bucket: str | None = Column(String(20), nullable=True)
-    post_hour: int | None = Column(Integer, nullable=True)
-    created_at: datetime = Column(DateTime, default=func.now())
-    updated_at: datetime = Column(DateTime, default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    linkedin_post_id: Mapped[str | None] = mapped_column(String, unique=True, nullable=True)
+    post_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    draft_id: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    title: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    post_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    post_type: Mapped[str | None] = mapped_column(String, nullable=True)
+    impressions: Mapped[int | None] = mapped_column(Integer, default=0)
+    members_reached: Mapped[int | None] = mapped_column(Integer, default=0)
+    reactions: Mapped[int | None] = mapped_column(Integer, default=0)
+    comments: Mapped[int | None] = mapped_column(Integer, default=0)
+    shares: Mapped[int | None] = mapped_column(Integer, default=0)
+    clicks: Mapped[int | None] = mapped_column(Integer, default=0)
+    engagement_rate: Mapped[float | None] = mapped_column(Float, default=0.0)
+    topic: Mapped[str | None] = mapped_column(String(50), nullable=True, index=True)
+    content_format: Mapped[str | None] = mapped_column("content_format", String(30), nullable=True, index=True)
+    hook_style: Mapped[str | None] = mapped_column(String(30), nullable=True, index=True)
+    length_bucket: Mapped[str | None] = mapped_column(String(20), nullable=True, index=True)
+    post_hour: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
 
     # Post body content (stored when composed via the dashboard composer)
-    content: str | None = Column("content", Text, nullable=True)
+    content: Mapped[str | None] = mapped_column("content", Text, nullable=True)
 
     # Post lifecycle status: "draft", "published", "analytics_linked", or None (imported)
-    status: str | None = Column("status", String(20), nullable=True)
+    status: Mapped[str | None] = mapped_column("status", String(20), nullable=True)
 
     # Additional per-post metrics from per-post XLSX exports
-    saves: int | None = Column(Integer, nullable=True, default=0)
-    sends: int | None = Column(Integer, nullable=True, default=0)
-    profile_views: int | None = Column(Integer, nullable=True, default=0)
-    followers_gained: int | None = Column(Integer, nullable=True, default=0)
-    reposts: int | None = Column(Integer, nullable=True, default=0)
-
-    daily_metrics = relationship(
-        "DailyMetric", back_populates="post", cascade="all, delete-orphan"
+    saves: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0)
+    sends: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0)
+    profile_views: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0)
+    followers_gained: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0)
+    reposts: Mapped[int | None] = mapped_column(Integer, nullable=True, default=0)
+
+    # Lazy by default so list queries never pull children; the post detail
+    # routes opt in with selectinload. order_by matches how those pages list
+    # them. passive_deletes lets the FK's ON DELETE CASCADE remove children
+    # without the ORM first SELECTing them.
+    daily_metrics: Mapped[list["DailyMetric"]] = relationship(
+        "DailyMetric",
+        back_populates="post",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="DailyMetric.metric_date",
     )
-    demographics = relationship(
-        "PostDemographic", back_populates="post", cascade="all, delete-orphan"
+    demographics: Mapped[list["PostDemographic"]] = relationship(
+        "PostDemographic",
+        back_populates="post",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="(PostDemographic.category, PostDemographic.percentage.desc())",
     )
 
     @property
@@ -77,7 +94,7 @@ class Post(Base):
             return f"Post {self.post_date} (#{self.linkedin_post_id[-6:]})"
         return f"Post {self.post_date}"
 
-    @property
+    @hybrid_property
     def weighted_score(self) -> float:
         """Quality-weighted engagement score.
 
@@ -93,6 +110,24 @@ class Post(Base):
             + (4 * (self.shares or 0))
         ) / self.impressions
 
+    @weighted_score.inplace.expression
+    @classmethod
+    def _weighted_score_expression(cls):
+        """SQL form of weighted_score, so queries can filter and sort on it.
+
+        Mirrors the Python body: NULL counts are treated as 0 and posts with
+        no impressions score 0.0. The 1.0 factor forces real division in SQLite.
+        """
+        weighted = (
+            (1 * func.coalesce(cls.reactions, 0))
+            + (3 * func.coalesce(cls.comments, 0))
+            + (4 * func.coalesce(cls.shares, 0))
+        )
+        return case(
+            (func.coalesce(cls.impressions, 0) == 0, 0.0),
+            else_=weighted * 1.0 / cls.impressions,
+        )
+
     def recalculate_engagement_rate(self) -> None:
         """Recalculate engagement_rate from raw metrics."""
         if self.impressions and self.impressions > 0:
@@ -102,6 +137,34 @@ class Post(Base):
         else:
             self.engagement_rate = 0.0
 
+    @classmethod
+    def bulk_recalculate_engagement_rates(
+        cls, session: Session, post_ids: list[int] | None = None
+    ) -> None:
+        """Recalculate engagement_rate in one UPDATE instead of per instance.
+
+        Same formula as recalculate_engagement_rate, evaluated by the database.
+        Pending changes must be flushed first so the UPDATE sees them.
+
+        Args:
+            session: SQLAlchemy session.
+            post_ids: Restrict the update to these posts (default: all posts).
+        """
+        engagements = (
+            func.coalesce(cls.reactions, 0)
+            + func.coalesce(cls.comments, 0)
+            + func.coalesce(cls.shares, 0)
+        )
+        stmt = update(cls).values(
+            engagement_rate=case(
+                (func.coalesce(cls.impressions, 0) > 0, engagements * 1.0 / cls.impressions),
+                else_=0.0,
+            )
+        )
+        if post_ids is not None:
+            stmt = stmt.where(cls.id.in_(post_ids))
+        session.execute(stmt, execution_options={"synchronize_session": "fetch"})
+
     def __repr__(self) -> str:
         return f"<Post id={self.id} date={self.post_date} impressions={self.impressions}>"
 
@@ -109,23 +172,40 @@ class Post(Base):
 class DailyMetric(Base):
     __tablename__ = "daily_metrics"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    post_id: int | None = Column(
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    post_id: Mapped[int | None] = mapped_column(
         Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True
     )
-    metric_date: date = Column(Date, nullable=False)
-    impressions: int = Column(Integer, default=0)
-    members_reached: int = Column(Integer, default=0)
-    reactions: int = Column(Integer, default=0)
-    comments: int = Column(Integer, default=0)
-    shares: int = Column(Integer, default=0)
-    clicks: int = Column(Integer, default=0)
-    created_at: datetime = Column(DateTime, default=func.now())
+    metric_date: Mapped[date] = mapped_column(Date, nullable=False)
+    impressions: Mapped[int | None] = mapped_column(Integer, default=0)
+    members_reached: Mapped[int | None] = mapped_column(Integer, default=0)
+    reactions: Mapped[int | None] = mapped_column(Integer, default=0)
+    comments: Mapped[int | None] = mapped_column(Integer, default=0)
+    shares: Mapped[int | None] = mapped_column(Integer, default=0)
+    clicks: Mapped[int | None] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
 
-    post = relationship("Post", back_populates="daily_metrics")
+    post: Mapped["Post | None"] = relationship("Post", back_populates="daily_metrics")
 
     __table_args__ = (
         UniqueConstraint("post_id", "metric_date", name="uq_post_date"),
+        # Account-level rows (post_id IS NULL) feed the summary cards and the
+        # timeseries chart, which seek post_id and a metric_date range and sum
+        # one metric per day. Same leading columns as uq_post_date plus every
+        # metric, so those reads are index-only and arrive in metric_date
+        # order for GROUP BY. Not partial: SQLite's planner prefers
+        # uq_post_date's post_id equality over a post_id IS NULL partial index.
+        Index(
+            "ix_daily_post_date_metrics",
+            "post_id",
+            "metric_date",
+            "impressions",
+            "members_reached",
+            "reactions",
+            "comments",
+            "shares",
+            "clicks",
+        ),
     )
 
     def __repr__(self) -> str:
@@ -135,11 +215,11 @@ class DailyMetric(Base):
 class FollowerSnapshot(Base):
     __tablename__ = "follower_snapshots"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_date: date = Column(Date, nullable=False, unique=True)
-    total_followers: int = Column(Integer, nullable=False)
-    new_followers: int = Column(Integer, default=0)
-    created_at: datetime = Column(DateTime, default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    snapshot_date: Mapped[date] = mapped_column(Date, nullable=False, unique=True)
+    total_followers: Mapped[int] = mapped_column(Integer, nullable=False)
+    new_followers: Mapped[int | None] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
 
     def __repr__(self) -> str:
         return f"<FollowerSnapshot date={self.snapshot_date} total={self.total_followers}>"
@@ -148,17 +228,24 @@ class FollowerSnapshot(Base):
 class DemographicSnapshot(Base):
     __tablename__ = "demographic_snapshots"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    snapshot_date: date = Column(Date, nullable=False)
-    category: str = Column(String, nullable=False)
-    value: str = Column(String, nullable=False)
-    percentage: float = Column(Float, nullable=False)
-    created_at: datetime = Column(DateTime, default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    snapshot_date: Mapped[date] = mapped_column(Date, nullable=False)
+    category: Mapped[str] = mapped_column(String, nullable=False)
+    value: Mapped[str] = mapped_column(String, nullable=False)
+    percentage: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
 
     __table_args__ = (
         UniqueConstraint(
             "snapshot_date", "category", "value", name="uq_demo_snapshot"
         ),
+        # Audience charts look up the latest snapshot per category; the unique
+        # constraint leads with snapshot_date and cannot serve that seek.
+        # Trailing percentage returns the rows already ranked (SQLite walks
+        # the index backwards for the DESC order), so no sort step is needed.
+        Index(
+            "ix_demo_snapshot_category_date_pct", "category", "snapshot_date", "percentage"
+        ),
     )
 
     def __repr__(self) -> str:
@@ -180,17 +267,20 @@ class PostDemographic(Base):
 
     __tablename__ = "post_demographics"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    post_id: int = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
-    category: str = Column(String, nullable=False)
-    value: str = Column(String, nullable=False)
-    percentage: float = Column(Float, nullable=False)
-    created_at: datetime = Column(DateTime, default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    post_id: Mapped[int] = mapped_column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    category: Mapped[str] = mapped_column(String, nullable=False)
+    value: Mapped[str] = mapped_column(String, nullable=False)
+    percentage: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
 
-    post = relationship("Post", back_populates="demographics")
+    post: Mapped["Post"] = relationship("Post", back_populates="demographics")
 
     __table_args__ = (
         UniqueConstraint("post_id", "category", "value", name="uq_post_demo"),
+        # Post detail lists demographics ORDER BY category, percentage DESC;
+        # matching the mixed direction in the index avoids a sort.
+        Index("ix_post_demo_post_category_pct", "post_id", "category", text("percentage DESC")),
     )
 
     def __repr__(self) -> str:
@@ -200,30 +290,42 @@ class PostDemographic(Base):
 class Upload(Base):
     __tablename__ = "uploads"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    filename: str = Column(String, nullable=False)
-    file_hash: str = Column(String, nullable=False, unique=True)
-    upload_date: datetime = Column(DateTime, default=func.now())
-    records_imported: int = Column(Integer, default=0)
-    status: str = Column(String, default="completed")
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    file_hash: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    upload_date: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
+    records_imported: Mapped[int | None] = mapped_column(Integer, default=0)
+    status: Mapped[str | None] = mapped_column(String, default="completed")
 
     def __repr__(self) -> str:
         return f"<Upload id={self.id} file={self.filename} status={self.status}>"
 
 
+@lru_cache(maxsize=8)
+def _scope_set(scopes: str) -> frozenset[str]:
+    """Split a space-separated scope string into a set, once per distinct value."""
+    return frozenset(scopes.split())
+
+
 class OAuthToken(Base):
     __tablename__ = "oauth_tokens"
 
-    id: int = Column(Integer, primary_key=True, autoincrement=True)
-    provider: str = Column(String, nullable=False, default="linkedin", unique=True)
-    access_token_encrypted: str = Column(String, nullable=False)
-    refresh_token_encrypted: str = Column(String, nullable=False)
-    access_token_expires_at: datetime = Column(DateTime, nullable=False)
-    refresh_token_expires_at: datetime = Column(DateTime, nullable=False)
-    scopes: str = Column(String, nullable=False)  # space-separated scope list
-    linkedin_member_id: str | None = Column(String, nullable=True)  # URN sub from /userinfo
-    created_at: datetime = Column(DateTime, default=func.now())
-    updated_at: datetime = Column(DateTime, default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    provider: Mapped[str] = mapped_column(String, nullable=False, default="linkedin", unique=True)
+    access_token_encrypted: Mapped[str] = mapped_column(String, nullable=False)
+    # Only read when an access token is being refreshed, so it is not loaded
+    # with the row on status checks and valid-token lookups.
+    refresh_token_encrypted: Mapped[str] = mapped_column(String, nullable=False, deferred=True)
+    access_token_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    refresh_token_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    scopes: Mapped[str] = mapped_column(String, nullable=False)  # space-separated scope list
+    linkedin_member_id: Mapped[str | None] = mapped_column(String, nullable=True)  # URN sub from /userinfo
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now())
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+
+    def has_scope(self, scope: str) -> bool:
+        """Return True if scope was granted to this token."""
+        return bool(self.scopes) and scope in _scope_set(self.scopes)
 
     def __repr__(self) -> str:
         return f"<OAuthToken provider={self.provider} expires_at={self.access_token_expires_at}>"
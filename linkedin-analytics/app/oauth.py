@@ -1,31 +1,51 @@
 """LinkedIn OAuth 2.0 flow logic.
 
 Handles authorization URL construction, token exchange, token refresh,
-Fernet encryption/decryption, HMAC state signing, token storage, and
-auth status queries. All sensitive exceptions are sanitized before
+AES-GCM token encryption (with a legacy Fernet read path), HMAC state
+signing, token storage, and auth status queries. All sensitive exceptions are sanitized before
 propagation to prevent client_secret leakage.
 """
 
+import base64
 import hashlib
 import hmac
 import logging
+import os
 import secrets
 import threading
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from urllib.parse import quote_plus, urlencode
 
 import httpx
+import orjson
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.linkedin_client import clear_header_cache
 from app.models import OAuthToken
 
 logger = logging.getLogger(__name__)
 
-# In-process lock to prevent concurrent token refresh attempts.
+# In-process lock to prevent concurrent token refresh attempts. The app runs
+# as a single uvicorn process, so this is the only exclusion needed; SQLite
+# has no row locks (SELECT ... FOR UPDATE is dropped by its dialect).
 _refresh_lock = threading.Lock()
 
+# Bumped by every store_tokens() and revoke_tokens() call. A refresher that
+# sees the same value after taking the lock knows the row was neither
+# rewritten nor deleted meanwhile and can skip re-reading it.
+_token_generation = 0
+
 # LinkedIn OAuth endpoints
 _AUTHORIZATION_URL = "https://www.linkedin.com/oauth/v2/authorization"
 _TOKEN_URL = "https://www.linkedin.com/oauth/v2/accessToken"
@@ -39,9 +59,35 @@ _SCOPES = "openid profile w_member_social"
 _ACCESS_TOKEN_LIFETIME_SECONDS = 60 * 24 * 3600  # 60 days
 _REFRESH_TOKEN_LIFETIME_SECONDS = 365 * 24 * 3600  # 365 days
 
+# Shared client for the token endpoint. Keep-alive lets a refresh reuse the
+# connection opened by an earlier exchange instead of a new TCP+TLS handshake.
+_TOKEN_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+_TOKEN_CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=4)
+_token_client: httpx.Client | None = None
+_token_client_lock = threading.Lock()
+
 # Refresh buffer: refresh the access token if it expires within this window.
 _REFRESH_BUFFER_SECONDS = 300  # 5 minutes
 
+# Single-user design: at most one oauth_tokens row, keyed by this provider.
+_PROVIDER = "linkedin"
+
+# Provider lookup as a lambda statement: SQLAlchemy caches its construction
+# and compiled SQL keyed on the lambda's code location, so repeat calls skip
+# building and compiling the ORM query.
+_GET_TOKEN_STMT = lambda_stmt(
+    lambda: select(OAuthToken).where(OAuthToken.provider == _PROVIDER)
+)
+
+# Primary key of the provider row, remembered after the first lookup so later
+# loads go through Session.get (identity map first, then a PK select).
+_token_row_id: int | None = None
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """Return dt as an aware UTC datetime (SQLite hands back naive values)."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
 
 class OAuthTokenExchangeError(Exception):
     """Raised when the LinkedIn token exchange or refresh call fails.
@@ -81,23 +127,79 @@ class AuthStatus:
 # ---------------------------------------------------------------------------
 
 
+# Prefix marking AES-GCM ciphertexts. Fernet tokens are url-safe base64 and
+# always begin with "gAAAAA", so the two formats cannot be confused.
+_AESGCM_PREFIX = "v2:"
+
+# Nonce length recommended for AES-GCM.
+_AESGCM_NONCE_BYTES = 12
+
+
+@lru_cache(maxsize=2)
+def _fernet_for_key(key: str) -> Fernet:
+    """Build (once per key) a Fernet instance; key decoding and splitting are cached."""
+    return Fernet(key.encode())
+
+
 def _get_fernet() -> Fernet:
-    """Return a Fernet instance using the configured encryption key."""
-    return Fernet(settings.token_encryption_key.encode())
+    """Return a Fernet instance using the configured encryption key.
+
+    Keyed on the current setting rather than bound at import, so a changed
+    TOKEN_ENCRYPTION_KEY takes effect without a restart.
+    """
+    return _fernet_for_key(settings.token_encryption_key)
+
+
+@lru_cache(maxsize=2)
+def _aesgcm_for_key(key: str) -> AESGCM:
+    """Build (once per key) an AES-256-GCM cipher derived from the Fernet key.
+
+    The configured key stays a Fernet key (config.py validates it as one).
+    HKDF derives an independent AES key from it so the Fernet signing and
+    encryption halves are never reused under a second algorithm.
+    """
+    aes_key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"linkedin-analytics token-encryption aes-gcm",
+    ).derive(base64.urlsafe_b64decode(key.encode()))
+    return AESGCM(aes_key)
+
+
+def _get_aesgcm() -> AESGCM:
+    """Return the AES-GCM cipher for the configured encryption key."""
+    return _aesgcm_for_key(settings.token_encryption_key)
 
 
 def encrypt_token(plaintext: str) -> str:
-    """Encrypt a token string with Fernet. Returns a base64-encoded ciphertext."""
-    return _get_fernet().encrypt(plaintext.encode()).decode()
+    """Encrypt a token string with AES-256-GCM.
+
+    Returns ``"v2:"`` followed by the url-safe base64 of nonce + ciphertext.
+    """
+    nonce = os.urandom(_AESGCM_NONCE_BYTES)
+    sealed = _get_aesgcm().encrypt(nonce, plaintext.encode(), None)
+    return _AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
 
 
 def decrypt_token(ciphertext: str) -> str | None:
-    """Decrypt a Fernet-encrypted token string.
+    """Decrypt a stored token string.
+
+    Accepts both AES-GCM ciphertexts and legacy Fernet tokens written before
+    the switch; the latter are re-encrypted the next time tokens are stored.
 
     Returns the plaintext string, or None if the ciphertext is invalid
     (e.g. after key rotation). The caller should treat None as 'not connected'
     and prompt re-authorization.
     """
+    if ciphertext.startswith(_AESGCM_PREFIX):
+        try:
+            raw = base64.urlsafe_b64decode(ciphertext[len(_AESGCM_PREFIX):].encode())
+            nonce, sealed = raw[:_AESGCM_NONCE_BYTES], raw[_AESGCM_NONCE_BYTES:]
+            return _get_aesgcm().decrypt(nonce, sealed, None).decode()
+        except (InvalidTag, ValueError):
+            logger.warning("Token decryption failed (InvalidTag). Key may have been rotated.")
+            return None
     try:
         return _get_fernet().decrypt(ciphertext.encode()).decode()
     except InvalidToken:
@@ -110,6 +212,24 @@ def decrypt_token(ciphertext: str) -> str | None:
 # ---------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=8)
+def _hmac_template(key: str, prefix: bytes) -> hmac.HMAC:
+    """Return an HMAC-SHA256 keyed with key and already fed prefix.
+
+    The inner/outer key pads are computed once per (key, prefix); callers
+    .copy() the template instead of re-keying on every signature. Keyed on
+    the current setting so a changed TOKEN_ENCRYPTION_KEY takes effect.
+    """
+    return hmac.new(key.encode(), prefix, hashlib.sha256)
+
+
+def _hmac_hexdigest(message: str, prefix: bytes = b"") -> str:
+    """HMAC-SHA256 hex digest of prefix + message under TOKEN_ENCRYPTION_KEY."""
+    h = _hmac_template(settings.token_encryption_key, prefix).copy()
+    h.update(message.encode())
+    return h.hexdigest()
+
+
 def generate_state() -> str:
     """Generate a cryptographically random state token."""
     return secrets.token_urlsafe(32)
@@ -121,8 +241,7 @@ def sign_state(state: str) -> str:
     Returns the hex-encoded HMAC-SHA256 signature. This reuses the existing
     Fernet key material for signing, avoiding a new env var.
     """
-    key = settings.token_encryption_key.encode()
-    return hmac.new(key, state.encode(), hashlib.sha256).hexdigest()
+    return _hmac_hexdigest(state)
 
 
 def verify_state_signature(state: str, signature: str) -> bool:
@@ -146,9 +265,7 @@ def generate_disconnect_csrf_token(nonce: str) -> str:
     TOKEN_ENCRYPTION_KEY. The nonce is stored in a cookie set when the
     settings page is rendered.
     """
-    key = settings.token_encryption_key.encode()
-    message = f"disconnect:{nonce}".encode()
-    return hmac.new(key, message, hashlib.sha256).hexdigest()
+    return _hmac_hexdigest(nonce, prefix=b"disconnect:")
 
 
 def verify_disconnect_csrf_token(nonce: str, token: str) -> bool:
@@ -157,11 +274,38 @@ def verify_disconnect_csrf_token(nonce: str, token: str) -> bool:
     return hmac.compare_digest(expected, token)
 
 
+def generate_publish_csrf_token(nonce: str) -> str:
+    """Generate a CSRF token for the compose page's publish request.
+
+    Same construction as the disconnect token with a 'publish:' prefix, so a
+    token issued for one form cannot be replayed against the other.
+    """
+    return _hmac_hexdigest(nonce, prefix=b"publish:")
+
+
+def verify_publish_csrf_token(nonce: str, token: str) -> bool:
+    """Verify the publish CSRF token using hmac.compare_digest."""
+    expected = generate_publish_csrf_token(nonce)
+    return hmac.compare_digest(expected, token)
+
+
 # ---------------------------------------------------------------------------
 # Authorization URL
 # ---------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=2)
+def _authorization_url_prefix(client_id: str, redirect_uri: str) -> str:
+    """Encode the static part of the authorization URL once per configuration."""
+    params = {
+        "response_type": "code",
+        "client_id": client_id,
+        "redirect_uri": redirect_uri,
+        "scope": _SCOPES,
+    }
+    return f"{_AUTHORIZATION_URL}?{urlencode(params)}&state="
+
+
 def build_authorization_url(state: str) -> str:
     """Construct the LinkedIn authorization URL.
 
@@ -171,16 +315,10 @@ def build_authorization_url(state: str) -> str:
     Returns:
         The full LinkedIn authorization URL to redirect the user to.
     """
-    import urllib.parse
-
-    params = {
-        "response_type": "code",
-        "client_id": settings.linkedin_client_id,
-        "redirect_uri": settings.linkedin_redirect_uri,
-        "scope": _SCOPES,
-        "state": state,
-    }
-    return f"{_AUTHORIZATION_URL}?{urllib.parse.urlencode(params)}"
+    prefix = _authorization_url_prefix(
+        settings.linkedin_client_id, settings.linkedin_redirect_uri
+    )
+    return prefix + quote_plus(state)
 
 
 # ---------------------------------------------------------------------------
@@ -188,6 +326,31 @@ def build_authorization_url(state: str) -> str:
 # ---------------------------------------------------------------------------
 
 
+def _get_token_client() -> httpx.Client:
+    """Return the shared token-endpoint client, creating it on first use.
+
+    Token calls run in worker threads, so creation is guarded by a lock.
+    """
+    global _token_client
+    with _token_client_lock:
+        if _token_client is None or _token_client.is_closed:
+            _token_client = httpx.Client(
+                http2=True,
+                timeout=_TOKEN_TIMEOUT,
+                limits=_TOKEN_CLIENT_LIMITS,
+            )
+        return _token_client
+
+
+def close_http_client() -> None:
+    """Close the shared token-endpoint client. Called on application shutdown."""
+    global _token_client
+    with _token_client_lock:
+        if _token_client is not None:
+            _token_client.close()
+            _token_client = None
+
+
 def exchange_code_for_tokens(code: str) -> TokenResponse:
     """Exchange an authorization code for access and refresh tokens.
 
@@ -212,18 +375,16 @@ def exchange_code_for_tokens(code: str) -> TokenResponse:
         "client_secret": settings.linkedin_client_secret,
     }
     try:
-        response = httpx.post(_TOKEN_URL, data=payload, timeout=httpx.Timeout(10.0))
-        response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        logger.error("Token exchange failed with status %d", e.response.status_code)
-        raise OAuthTokenExchangeError(
-            f"LinkedIn returned status {e.response.status_code}"
-        ) from None
+        response = _get_token_client().post(_TOKEN_URL, data=payload)
     except httpx.HTTPError:
         logger.error("Token exchange failed: network error")
         raise OAuthTokenExchangeError("Network error during token exchange") from None
 
-    data = response.json()
+    if not response.is_success:
+        logger.error("Token exchange failed with status %d", response.status_code)
+        raise OAuthTokenExchangeError(f"LinkedIn returned status {response.status_code}")
+
+    data = orjson.loads(response.content)
     return TokenResponse(
         access_token=data["access_token"],
         refresh_token=data.get("refresh_token", ""),
@@ -256,18 +417,16 @@ def refresh_access_token(refresh_token: str) -> TokenResponse:
         "client_secret": settings.linkedin_client_secret,
     }
     try:
-        response = httpx.post(_TOKEN_URL, data=payload, timeout=httpx.Timeout(10.0))
-        response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        logger.error("Token refresh failed with status %d", e.response.status_code)
-        raise OAuthTokenExchangeError(
-            f"LinkedIn returned status {e.response.status_code}"
-        ) from None
+        response = _get_token_client().post(_TOKEN_URL, data=payload)
     except httpx.HTTPError:
         logger.error("Token refresh failed: network error")
         raise OAuthTokenExchangeError("Network error during token refresh") from None
 
-    data = response.json()
+    if not response.is_success:
+        logger.error("Token refresh failed with status %d", response.status_code)
+        raise OAuthTokenExchangeError(f"LinkedIn returned status {response.status_code}")
+
+    data = orjson.loads(response.content)
     return TokenResponse(
         access_token=data["access_token"],
         refresh_token=data.get("refresh_token", refresh_token),
@@ -284,57 +443,95 @@ def refresh_access_token(refresh_token: str) -> TokenResponse:
 # ---------------------------------------------------------------------------
 
 
+def get_token_row(db: Session) -> OAuthToken | None:
+    """Return the stored LinkedIn OAuthToken row, or None if not connected.
+
+    Once the row's id is known, lookups use Session.get, which returns the
+    instance already loaded in this session without touching the database.
+    Falls back to the provider query when the id is unknown or stale (e.g.
+    after a disconnect and reconnect).
+
+    Args:
+        db: SQLAlchemy session.
+
+    Returns:
+        The OAuthToken row, or None.
+    """
+    global _token_row_id
+    if _token_row_id is not None:
+        row = db.get(OAuthToken, _token_row_id)
+        if row is not None and row.provider == _PROVIDER:
+            return row
+    row = db.execute(_GET_TOKEN_STMT).scalar_one_or_none()
+    _token_row_id = row.id if row else None
+    return row
+
+
 def store_tokens(
     db: Session,
     token_response: TokenResponse,
     member_id: str | None = None,
+    stored_refresh_encrypted: str | None = None,
 ) -> OAuthToken:
     """Encrypt and upsert tokens in the oauth_tokens table.
 
     Single-user design: there is at most one row with provider='linkedin'.
-    On re-authorization, the existing row is updated in place.
+    On re-authorization, the existing row is updated in place. Both cases are
+    a single INSERT ... ON CONFLICT (provider) DO UPDATE ... RETURNING.
 
     Args:
         db: SQLAlchemy session.
         token_response: Parsed token response from LinkedIn.
         member_id: Optional LinkedIn member URN from /userinfo.
+        stored_refresh_encrypted: Ciphertext of the refresh token already
+            stored, passed when the refresh returned that same token. It is
+            reused instead of re-encrypted, and the stored refresh token and
+            its expiry are left untouched.
 
     Returns:
         The OAuthToken row (created or updated).
     """
+    global _token_row_id, _token_generation
     now = datetime.now(timezone.utc)
     access_expires_at = now + timedelta(seconds=token_response.expires_in)
     refresh_expires_at = now + timedelta(seconds=token_response.refresh_token_expires_in)
 
     encrypted_access = encrypt_token(token_response.access_token)
-    encrypted_refresh = encrypt_token(token_response.refresh_token)
-
-    existing = db.query(OAuthToken).filter(OAuthToken.provider == "linkedin").first()
-    if existing:
-        existing.access_token_encrypted = encrypted_access
-        existing.refresh_token_encrypted = encrypted_refresh
-        existing.access_token_expires_at = access_expires_at
-        existing.refresh_token_expires_at = refresh_expires_at
-        existing.scopes = token_response.scope
-        if member_id is not None:
-            existing.linkedin_member_id = member_id
-        db.commit()
-        db.refresh(existing)
-        return existing
+    if stored_refresh_encrypted is not None:
+        encrypted_refresh = stored_refresh_encrypted
     else:
-        row = OAuthToken(
-            provider="linkedin",
-            access_token_encrypted=encrypted_access,
-            refresh_token_encrypted=encrypted_refresh,
-            access_token_expires_at=access_expires_at,
-            refresh_token_expires_at=refresh_expires_at,
-            scopes=token_response.scope,
-            linkedin_member_id=member_id,
-        )
-        db.add(row)
-        db.commit()
-        db.refresh(row)
-        return row
+        encrypted_refresh = encrypt_token(token_response.refresh_token)
+
+    # The previous access token is superseded; drop its memoized API headers.
+    clear_header_cache()
+
+    values = {
+        "access_token_encrypted": encrypted_access,
+        "refresh_token_encrypted": encrypted_refresh,
+        "access_token_expires_at": access_expires_at,
+        "refresh_token_expires_at": refresh_expires_at,
+        "scopes": token_response.scope,
+    }
+    # A refresh carries no member ID; keep the one stored at connect time.
+    update_values = {**values, "updated_at": func.now()}
+    if stored_refresh_encrypted is not None:
+        del update_values["refresh_token_encrypted"]
+        del update_values["refresh_token_expires_at"]
+    if member_id is not None:
+        update_values["linkedin_member_id"] = member_id
+
+    stmt = (
+        sqlite_insert(OAuthToken)
+        .values(provider=_PROVIDER, linkedin_member_id=member_id, **values)
+        .on_conflict_do_update(index_elements=[OAuthToken.provider], set_=update_values)
+        .returning(OAuthToken)
+    )
+    # populate_existing refreshes a copy of the row already in this session.
+    row = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+    _token_row_id = row.id  # read before commit expires the instance
+    db.commit()
+    _token_generation += 1
+    return row
 
 
 # ---------------------------------------------------------------------------
@@ -362,42 +559,38 @@ def get_valid_access_token(db: Session) -> str | None:
     Returns:
         Decrypted access token string, or None if not connected or refresh failed.
     """
-    row = db.query(OAuthToken).filter(OAuthToken.provider == "linkedin").first()
+    # Read before loading the row, so any write that could make the loaded
+    # row stale is guaranteed to change it.
+    generation = _token_generation
+    row = get_token_row(db)
     if not row:
         return None
 
     now = datetime.now(timezone.utc)
-
-    # Make expires_at timezone-aware if needed (SQLite stores naive datetimes).
-    access_expires_at = row.access_token_expires_at
-    if access_expires_at.tzinfo is None:
-        access_expires_at = access_expires_at.replace(tzinfo=timezone.utc)
-
-    refresh_expires_at = row.refresh_token_expires_at
-    if refresh_expires_at.tzinfo is None:
-        refresh_expires_at = refresh_expires_at.replace(tzinfo=timezone.utc)
-
     buffer = timedelta(seconds=_REFRESH_BUFFER_SECONDS)
 
     # Fast path: access token is still valid.
-    if access_expires_at - now > buffer:
+    if _as_utc(row.access_token_expires_at) - now > buffer:
         decrypted = decrypt_token(row.access_token_encrypted)
         return decrypted  # None if key was rotated
 
     # Access token is expired or near expiry. Acquire lock before refreshing.
     with _refresh_lock:
-        # Re-read from DB inside lock: another thread may have already refreshed.
-        db.refresh(row)
-        access_expires_at = row.access_token_expires_at
-        if access_expires_at.tzinfo is None:
-            access_expires_at = access_expires_at.replace(tzinfo=timezone.utc)
-
-        if access_expires_at - now > buffer:
-            # Another thread refreshed while we waited for the lock.
-            return decrypt_token(row.access_token_encrypted)
+        # Another thread may have refreshed or disconnected while we waited
+        # for the lock; only then does the row need re-reading.
+        if _token_generation != generation:
+            try:
+                db.refresh(row)
+            except InvalidRequestError:
+                # Row deleted by a disconnect. Refreshing now would re-insert
+                # it through store_tokens' upsert and undo the disconnect.
+                logger.info("Token row removed while waiting to refresh.")
+                return None
+            if _as_utc(row.access_token_expires_at) - now > buffer:
+                return decrypt_token(row.access_token_encrypted)
 
         # Check refresh token expiry.
-        if refresh_expires_at <= now:
+        if _as_utc(row.refresh_token_expires_at) <= now:
             logger.warning("Refresh token is expired. Re-authorization required.")
             return None
 
@@ -412,10 +605,16 @@ def get_valid_access_token(db: Session) -> str | None:
             logger.error("Token refresh failed: %s", e)
             return None
 
-        store_tokens(db, new_token_response)
-        # Re-read after store to get fresh encrypted value.
-        db.refresh(row)
-        return decrypt_token(row.access_token_encrypted)
+        # LinkedIn usually hands back the same refresh token; keep its stored
+        # ciphertext and expiry rather than re-encrypting it.
+        unchanged = new_token_response.refresh_token == decrypted_refresh
+        store_tokens(
+            db,
+            new_token_response,
+            stored_refresh_encrypted=row.refresh_token_encrypted if unchanged else None,
+        )
+        # The plaintext is already in hand; no need to re-read and decrypt it.
+        return new_token_response.access_token
 
 
 # ---------------------------------------------------------------------------
@@ -432,19 +631,13 @@ def get_auth_status(db: Session) -> AuthStatus:
     Returns:
         AuthStatus dataclass with connection details.
     """
-    row = db.query(OAuthToken).filter(OAuthToken.provider == "linkedin").first()
+    row = get_token_row(db)
     if not row:
         return AuthStatus(connected=False)
 
     now = datetime.now(timezone.utc)
-
-    access_expires_at = row.access_token_expires_at
-    if access_expires_at.tzinfo is None:
-        access_expires_at = access_expires_at.replace(tzinfo=timezone.utc)
-
-    refresh_expires_at = row.refresh_token_expires_at
-    if refresh_expires_at.tzinfo is None:
-        refresh_expires_at = refresh_expires_at.replace(tzinfo=timezone.utc)
+    access_expires_at = _as_utc(row.access_token_expires_at)
+    refresh_expires_at = _as_utc(row.refresh_token_expires_at)
 
     needs_reauth = refresh_expires_at <= now
 
@@ -479,7 +672,14 @@ def revoke_tokens(db: Session) -> None:
     Args:
         db: SQLAlchemy session.
     """
-    row = db.query(OAuthToken).filter(OAuthToken.provider == "linkedin").first()
-    if row:
-        db.delete(row)
-        db.commit()
+    global _token_row_id, _token_generation
+    # Under the refresh lock so a refresher waiting on it sees the bumped
+    # generation and re-reads (finding no row) instead of refreshing.
+    with _refresh_lock:
+        row = get_token_row(db)
+        if row:
+            db.delete(row)
+            db.commit()
+        _token_row_id = None
+        _token_generation += 1
+    clear_header_cache()
@@ -1,30 +1,146 @@
 """JSON API routes for chart data and dashboard metrics."""
 
+import asyncio
+import base64
+import binascii
 import hashlib
+import heapq
 import logging
 import math
+import os
 import re as _re
+import secrets
 import sqlite3
 import statistics
+import threading
 import time
 import uuid
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict, defaultdict, deque
 from datetime import date, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
+import openpyxl
+import orjson
 from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, UploadFile
-from fastapi.responses import FileResponse
-from sqlalchemy import desc, func
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from sqlalchemy import case, desc, func, select, tuple_
+from sqlalchemy.orm import Session, defer, load_only, selectinload
+from starlette.background import BackgroundTask
 
+from app import linkedin_client, oauth
 from app.config import settings
 from app.database import get_session
-from app.models import DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, PostDemographic, Upload
+from app.ingest import (
+    MAX_FILE_SIZE_BYTES,
+    IngestError,
+    _detect_file_format,
+    ingest_per_post_xlsx,
+    validate_upload_size,
+)
+from app.linkedin_client import LinkedInAPIError, LinkedInRateLimitError
+from app.models import (
+    DailyMetric,
+    DemographicSnapshot,
+    FollowerSnapshot,
+    Post,
+    Upload,
+)
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# Routes that return plain dicts are encoded with orjson rather than the
+# stdlib json module; routes that build their own Response are unaffected.
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Characters of post content shown in list views before truncating with "...".
+_CONTENT_PREVIEW_CHARS = 200
+
+
+# ---------------------------------------------------------------------------
+# Aggregate cache
+# ---------------------------------------------------------------------------
+
+# Summary, demographics and follower figures change only when data is
+# imported or posts are edited, yet every dashboard render requests them.
+# Entries live for a minute; keys carry the cache generation, which
+# invalidate_metrics_cache() bumps after each write so stale entries are
+# never served.
+_metrics_cache: OrderedDict[tuple, tuple[float, dict[str, Any]]] = OrderedDict()
+_METRICS_CACHE_TTL_SECONDS = 60
+_METRICS_CACHE_MAX_ENTRIES = 64
+_metrics_cache_generation = 0
+# Sync routes (batch upload) invalidate from threadpool workers while async
+# handlers read and fill the cache on the event loop; the lock keeps a clear
+# from landing between put's capacity check and its eviction.
+_metrics_cache_lock = threading.Lock()
+
+
+def invalidate_metrics_cache() -> None:
+    """Drop cached aggregates. Call after committing imported or edited data."""
+    global _metrics_cache_generation
+    with _metrics_cache_lock:
+        _metrics_cache_generation += 1
+        _metrics_cache.clear()
+
+
+def _metrics_cache_key(name: str, *params: Any) -> tuple:
+    """Build a cache key for an endpoint and its parameters.
+
+    Includes today's date (lookback cutoffs move at midnight) and the current
+    generation, sampled before the query runs so that a write landing mid-query
+    leaves the result under an already-retired key.
+    """
+    return (name, _metrics_cache_generation, date.today(), *params)
+
+
+def _metrics_cache_get(key: tuple) -> dict[str, Any] | None:
+    """Return a cached payload if present and younger than the TTL."""
+    with _metrics_cache_lock:
+        entry = _metrics_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, payload = entry
+        if time.monotonic() - stored_at > _METRICS_CACHE_TTL_SECONDS:
+            _metrics_cache.pop(key, None)
+            return None
+        return payload
+
+
+def _metrics_cache_put(key: tuple, payload: dict[str, Any]) -> None:
+    """Store a payload, evicting the oldest entry when at capacity."""
+    with _metrics_cache_lock:
+        if len(_metrics_cache) >= _METRICS_CACHE_MAX_ENTRIES:
+            _metrics_cache.popitem(last=False)
+        _metrics_cache[key] = (time.monotonic(), payload)
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET
+# ---------------------------------------------------------------------------
+
+
+def _etag_response(request: Request, payload: dict[str, Any]) -> Response:
+    """Serialize payload with an ETag, answering 304 if the client already has it.
+
+    The dashboard re-polls the chart endpoints; when the data is unchanged the
+    response carries no body.
+
+    Args:
+        request: The incoming request (for If-None-Match).
+        payload: The JSON-serializable response body.
+
+    Returns:
+        A 304 response if If-None-Match matches, otherwise the JSON body.
+    """
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    client_tags = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in client_tags.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 # ---------------------------------------------------------------------------
@@ -45,9 +161,10 @@ async def health_check() -> dict[str, str]:
 
 @router.get("/api/metrics/summary")
 async def metrics_summary(
+    request: Request,
     days: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> Response:
     """Return KPI summary metrics for the dashboard header cards.
 
     Args:
@@ -57,51 +174,52 @@ async def metrics_summary(
         JSON with total_impressions, avg_engagement_rate, total_followers,
         total_posts_tracked, and new_followers_period.
     """
+    cache_key = _metrics_cache_key("summary", days)
+    cached = _metrics_cache_get(cache_key)
+    if cached is not None:
+        return _etag_response(request, cached)
+
     cutoff = date.today() - timedelta(days=days)
 
-    # Total impressions (from daily account-level metrics, post_id=None)
+    # All five figures come from scalar subqueries in one SELECT, so the
+    # header cards cost a single round trip.
     total_impressions = (
-        db.query(func.sum(DailyMetric.impressions))
-        .filter(DailyMetric.post_id.is_(None), DailyMetric.metric_date >= cutoff)
-        .scalar()
-        or 0
+        select(func.sum(DailyMetric.impressions))
+        .where(DailyMetric.post_id.is_(None), DailyMetric.metric_date >= cutoff)
+        .scalar_subquery()
     )
-
-    # Average engagement rate across posts in the period
     avg_engagement = (
-        db.query(func.avg(Post.engagement_rate))
-        .filter(Post.post_date >= cutoff)
-        .scalar()
-        or 0.0
+        select(func.avg(Post.engagement_rate))
+        .where(Post.post_date >= cutoff)
+        .scalar_subquery()
     )
-
-    # Latest follower count
-    latest_snapshot = (
-        db.query(FollowerSnapshot)
+    latest_followers = (
+        select(FollowerSnapshot.total_followers)
         .order_by(desc(FollowerSnapshot.snapshot_date))
-        .first()
+        .limit(1)
+        .scalar_subquery()
     )
-    total_followers = latest_snapshot.total_followers if latest_snapshot else 0
-
-    # New followers in period
     new_followers = (
-        db.query(func.sum(FollowerSnapshot.new_followers))
-        .filter(FollowerSnapshot.snapshot_date >= cutoff)
-        .scalar()
-        or 0
+        select(func.sum(FollowerSnapshot.new_followers))
+        .where(FollowerSnapshot.snapshot_date >= cutoff)
+        .scalar_subquery()
     )
-
-    # Total posts tracked
-    total_posts = db.query(func.count(Post.id)).scalar() or 0
-
-    return {
-        "total_impressions": int(total_impressions),
-        "avg_engagement_rate": round(float(avg_engagement), 4),
-        "total_followers": int(total_followers),
-        "new_followers_period": int(new_followers),
-        "total_posts_tracked": int(total_posts),
+    total_posts = select(func.count(Post.id)).scalar_subquery()
+
+    row = db.execute(
+        select(total_impressions, avg_engagement, latest_followers, new_followers, total_posts)
+    ).one()
+
+    payload = {
+        "total_impressions": int(row[0] or 0),
+        "avg_engagement_rate": round(float(row[1] or 0.0), 4),
+        "total_followers": int(row[2] or 0),
+        "new_followers_period": int(row[3] or 0),
+        "total_posts_tracked": int(row[4] or 0),
         "period_days": days,
     }
+    _metrics_cache_put(cache_key, payload)
+    return _etag_response(request, payload)
 
 
 # ---------------------------------------------------------------------------
@@ -111,10 +229,11 @@ async def metrics_summary(
 
 @router.get("/api/metrics/timeseries")
 async def metrics_timeseries(
+    request: Request,
     metric: str = Query("impressions", pattern="^(impressions|members_reached|reactions|comments|shares|clicks)$"),
     days: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> Response:
     """Return daily time series data for a given metric.
 
     Args:
@@ -137,23 +256,22 @@ async def metrics_timeseries(
     }
     col = column_map[metric]
 
-    rows = (
-        db.query(DailyMetric.metric_date, func.sum(col).label("value"))
-        .filter(DailyMetric.post_id.is_(None), DailyMetric.metric_date >= cutoff)
+    rows = db.execute(
+        select(DailyMetric.metric_date, func.sum(col))
+        .where(DailyMetric.post_id.is_(None), DailyMetric.metric_date >= cutoff)
         .group_by(DailyMetric.metric_date)
         .order_by(DailyMetric.metric_date)
-        .all()
-    )
+    ).all()
 
-    labels = [str(r.metric_date) for r in rows]
-    values = [int(r.value or 0) for r in rows]
+    labels = [str(metric_date) for metric_date, _ in rows]
+    values = [int(value or 0) for _, value in rows]
 
-    return {
+    return _etag_response(request, {
         "metric": metric,
         "period_days": days,
         "labels": labels,
         "values": values,
-    }
+    })
 
 
 # ---------------------------------------------------------------------------
@@ -161,51 +279,153 @@ async def metrics_timeseries(
 # ---------------------------------------------------------------------------
 
 
+# Metric columns are nullable, so they are sorted (and compared in keyset
+# cursors) as COALESCE(col, 0): a NULL would make the row-value comparison
+# unknown and silently end the page walk. post_date is NOT NULL and sorts on
+# the bare column, so its index -- which SQLite suffixes with the rowid --
+# serves the (post_date, id) seek directly.
+_POST_SORT_COLUMNS = {
+    "post_date": Post.post_date,
+    "impressions": func.coalesce(Post.impressions, 0),
+    "engagement_rate": func.coalesce(Post.engagement_rate, 0.0),
+    "reactions": func.coalesce(Post.reactions, 0),
+    "comments": func.coalesce(Post.comments, 0),
+    "shares": func.coalesce(Post.shares, 0),
+    "clicks": func.coalesce(Post.clicks, 0),
+}
+
+
+def _encode_posts_cursor(sort: str, post: Post) -> str:
+    """Encode the position after ``post`` as an opaque ``after`` cursor.
+
+    Args:
+        sort: Sort field the page was ordered by.
+        post: Last post on the page.
+
+    Returns:
+        URL-safe base64 of ``[sort_value, id]``.
+    """
+    if sort == "post_date":
+        value: Any = post.post_date.isoformat()
+    else:
+        value = getattr(post, sort) or 0
+    return base64.urlsafe_b64encode(orjson.dumps([value, post.id])).decode("ascii")
+
+
+def _decode_posts_cursor(sort: str, cursor: str) -> tuple[Any, int]:
+    """Decode an ``after`` cursor produced by _encode_posts_cursor.
+
+    Args:
+        sort: Sort field of the current request.
+        cursor: Cursor string from a previous page's ``next_cursor``.
+
+    Returns:
+        Tuple of (sort_value, post_id).
+
+    Raises:
+        HTTPException 400: If the cursor is malformed or from another sort.
+    """
+    try:
+        value, post_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if sort == "post_date":
+            value = date.fromisoformat(value)
+        elif sort == "engagement_rate":
+            value = float(value)
+        elif type(value) is not int:
+            raise TypeError(value)
+        if type(post_id) is not int:
+            raise TypeError(post_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError, UnicodeEncodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    return value, post_id
+
+
 @router.get("/api/posts")
 async def list_posts(
     sort: str = Query("post_date", pattern="^(post_date|impressions|engagement_rate|reactions|comments|shares|clicks)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    after: str | None = Query(None, max_length=256),
+    include_total: bool = Query(False),
     db: Session = Depends(get_session),
 ) -> dict[str, Any]:
     """Return a paginated, sorted list of posts.
 
+    Pages can be walked by ``offset`` or, more cheaply, by passing the
+    previous page's ``next_cursor`` as ``after``: SQLite then seeks straight
+    to the next row instead of scanning and discarding ``offset`` rows.
+
     Args:
         sort: Field to sort by.
         order: Sort direction (asc or desc).
         limit: Maximum number of results.
-        offset: Number of records to skip.
+        offset: Number of records to skip. Ignored when ``after`` is given.
+        after: Keyset cursor from a previous page's ``next_cursor``.
+        include_total: Count all posts on cursor pages too. Offset pages
+            always include the total.
 
     Returns:
-        JSON with total count and list of post objects.
+        JSON with total count (None on cursor pages unless requested),
+        list of post objects, and the cursor for the following page.
+
+    Raises:
+        HTTPException 400: If ``after`` is not a valid cursor.
     """
-    sort_map = {
-        "post_date": Post.post_date,
-        "impressions": Post.impressions,
-        "engagement_rate": Post.engagement_rate,
-        "reactions": Post.reactions,
-        "comments": Post.comments,
-        "shares": Post.shares,
-        "clicks": Post.clicks,
-    }
-    sort_col = sort_map[sort]
-    sort_expr = desc(sort_col) if order == "desc" else sort_col
+    sort_key = _POST_SORT_COLUMNS[sort]
+    # id breaks ties so the order is total and a cursor names one position.
+    if order == "desc":
+        order_by = (desc(sort_key), desc(Post.id))
+    else:
+        order_by = (sort_key, Post.id)
+
+    # The full content column is deferred; the card preview only needs its
+    # head, which SQLite slices (one extra char tells whether to add "...").
+    content_head = func.substr(Post.content, 1, _CONTENT_PREVIEW_CHARS + 1)
+
+    if after is not None:
+        position = tuple_(sort_key, Post.id)
+        bound = tuple_(*_decode_posts_cursor(sort, after))
+        rows = (
+            db.query(Post, content_head)
+            .options(defer(Post.content))
+            .filter(position < bound if order == "desc" else position > bound)
+            .order_by(*order_by)
+            .limit(limit)
+            .all()
+        )
+        offset = 0
+        total = None
+        if include_total:
+            total = db.query(func.count(Post.id)).scalar() or 0
+    else:
+        # COUNT(*) OVER () is evaluated before LIMIT/OFFSET, so each row
+        # carries the full total and the page needs no separate count query.
+        windowed = (
+            db.query(Post, content_head, func.count().over())
+            .options(defer(Post.content))
+            .order_by(*order_by)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        if windowed:
+            total = windowed[0][2]
+        elif offset:
+            # Paged past the end: no row to read the total from.
+            total = db.query(func.count(Post.id)).scalar() or 0
+        else:
+            total = 0
+        rows = [(p, head) for p, head, _ in windowed]
 
-    total = db.query(func.count(Post.id)).scalar() or 0
-    posts = (
-        db.query(Post)
-        .order_by(sort_expr)
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    next_cursor = _encode_posts_cursor(sort, rows[-1][0]) if len(rows) == limit else None
 
     return {
         "total": total,
         "limit": limit,
         "offset": offset,
-        "posts": [_serialize_post(p) for p in posts],
+        "next_cursor": next_cursor,
+        "posts": [_serialize_post(p, head) for p, head in rows],
     }
 
 
@@ -225,18 +445,29 @@ async def get_post(
     Raises:
         HTTPException 404: If the post is not found.
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
+    # Children load with the post rather than in hand-written follow-up
+    # queries. The daily rows are limited to the serialized columns, all of
+    # which sit in ix_daily_post_date_metrics, so SQLite reads them from the
+    # index alone.
+    post = db.get(
+        Post,
+        post_id,
+        options=[
+            selectinload(Post.daily_metrics).load_only(
+                DailyMetric.metric_date,
+                DailyMetric.impressions,
+                DailyMetric.reactions,
+                DailyMetric.comments,
+                DailyMetric.shares,
+                DailyMetric.clicks,
+            ),
+            selectinload(Post.demographics),
+        ],
+    )
     if not post:
         raise HTTPException(status_code=404, detail=f"Post {post_id} not found.")
 
-    daily = (
-        db.query(DailyMetric)
-        .filter(DailyMetric.post_id == post_id)
-        .order_by(DailyMetric.metric_date)
-        .all()
-    )
-
-    data = _serialize_post(post, include_full_content=True)
+    data = _serialize_post(post, post.content, include_full_content=True)
     data["daily_metrics"] = [
         {
             "date": str(m.metric_date),
@@ -246,32 +477,28 @@ async def get_post(
             "shares": m.shares,
             "clicks": m.clicks,
         }
-        for m in daily
+        for m in post.daily_metrics
     ]
 
     # Include per-post demographics if available
-    post_demographics = (
-        db.query(PostDemographic)
-        .filter(PostDemographic.post_id == post_id)
-        .order_by(PostDemographic.category, PostDemographic.percentage.desc())
-        .all()
-    )
     data["demographics"] = [
         {
             "category": d.category,
             "value": d.value,
             "percentage": round(d.percentage * 100, 1),
         }
-        for d in post_demographics
+        for d in post.demographics
     ]
 
     return data
 
 
-def _serialize_post(post: Post, include_full_content: bool = False) -> dict[str, Any]:
-    content = post.content
-    if content and not include_full_content and len(content) > 200:
-        content_preview = content[:200] + "..."
+def _serialize_post(
+    post: Post, content: str | None, include_full_content: bool = False
+) -> dict[str, Any]:
+    """Serialize a post. content is passed in so list queries can defer the column."""
+    if content and not include_full_content and len(content) > _CONTENT_PREVIEW_CHARS:
+        content_preview = content[:_CONTENT_PREVIEW_CHARS] + "..."
     else:
         content_preview = content
 
@@ -311,9 +538,10 @@ def _serialize_post(post: Post, include_full_content: bool = False) -> dict[str,
 
 @router.get("/api/demographics")
 async def get_demographics(
+    request: Request,
     category: str = Query("industry", pattern="^(industry|job_title|seniority|location)$"),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> Response:
     """Return demographic breakdown for a given audience category.
 
     Args:
@@ -322,6 +550,11 @@ async def get_demographics(
     Returns:
         JSON with labels and values arrays for Chart.js.
     """
+    cache_key = _metrics_cache_key("demographics", category)
+    cached = _metrics_cache_get(cache_key)
+    if cached is not None:
+        return _etag_response(request, cached)
+
     # Use the most recent snapshot date for this category
     latest_date = (
         db.query(func.max(DemographicSnapshot.snapshot_date))
@@ -330,24 +563,28 @@ async def get_demographics(
     )
 
     if not latest_date:
-        return {"category": category, "snapshot_date": None, "labels": [], "values": []}
+        return _etag_response(
+            request, {"category": category, "snapshot_date": None, "labels": [], "values": []}
+        )
 
-    rows = (
-        db.query(DemographicSnapshot)
-        .filter(
+    # Plain column rows: the chart needs two arrays, not ORM instances.
+    rows = db.execute(
+        select(DemographicSnapshot.value, DemographicSnapshot.percentage)
+        .where(
             DemographicSnapshot.category == category,
             DemographicSnapshot.snapshot_date == latest_date,
         )
         .order_by(desc(DemographicSnapshot.percentage))
-        .all()
-    )
+    ).all()
 
-    return {
+    payload = {
         "category": category,
         "snapshot_date": str(latest_date),
-        "labels": [r.value for r in rows],
-        "values": [round(r.percentage * 100, 1) for r in rows],
+        "labels": [value for value, _ in rows],
+        "values": [round(percentage * 100, 1) for _, percentage in rows],
     }
+    _metrics_cache_put(cache_key, payload)
+    return _etag_response(request, payload)
 
 
 # ---------------------------------------------------------------------------
@@ -357,9 +594,10 @@ async def get_demographics(
 
 @router.get("/api/followers/trend")
 async def followers_trend(
+    request: Request,
     days: int = Query(90, ge=1, le=365),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> Response:
     """Return follower growth trend data.
 
     Args:
@@ -368,21 +606,33 @@ async def followers_trend(
     Returns:
         JSON with labels (dates) and total/new follower values.
     """
+    cache_key = _metrics_cache_key("followers_trend", days)
+    cached = _metrics_cache_get(cache_key)
+    if cached is not None:
+        return _etag_response(request, cached)
+
     cutoff = date.today() - timedelta(days=days)
 
-    rows = (
-        db.query(FollowerSnapshot)
-        .filter(FollowerSnapshot.snapshot_date >= cutoff)
+    rows = db.execute(
+        select(
+            FollowerSnapshot.snapshot_date,
+            FollowerSnapshot.total_followers,
+            FollowerSnapshot.new_followers,
+        )
+        .where(FollowerSnapshot.snapshot_date >= cutoff)
         .order_by(FollowerSnapshot.snapshot_date)
-        .all()
-    )
+    ).all()
+    # Transpose the rows into the three chart series in one pass.
+    dates, totals, new = zip(*rows) if rows else ((), (), ())
 
-    return {
+    payload = {
         "period_days": days,
-        "labels": [str(r.snapshot_date) for r in rows],
-        "total_followers": [r.total_followers for r in rows],
-        "new_followers": [r.new_followers for r in rows],
+        "labels": [str(d) for d in dates],
+        "total_followers": list(totals),
+        "new_followers": list(new),
     }
+    _metrics_cache_put(cache_key, payload)
+    return _etag_response(request, payload)
 
 
 # ---------------------------------------------------------------------------
@@ -390,6 +640,10 @@ async def followers_trend(
 # ---------------------------------------------------------------------------
 
 
+# Post fields that feed engagement_rate; only changes to these recompute it.
+_ENGAGEMENT_RATE_INPUTS = frozenset({"impressions", "reactions", "comments", "shares"})
+
+
 @router.patch("/api/posts/{post_id}")
 async def update_post(
     post_id: int,
@@ -419,44 +673,47 @@ async def update_post(
     are normalized on input: lowercased, stripped, spaces replaced with hyphens.
     Empty strings are stored as null to prevent cohort fragmentation.
     """
-    post = db.query(Post).filter_by(id=post_id).first()
+    post = db.get(Post, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if draft_id is not None:
-        post.draft_id = draft_id if draft_id else None
-    if title is not None:
-        post.title = title if title else None
-    if impressions is not None:
-        post.impressions = impressions
-    if reactions is not None:
-        post.reactions = reactions
-    if comments is not None:
-        post.comments = comments
-    if shares is not None:
-        post.shares = shares
-    if clicks is not None:
-        post.clicks = clicks
-    if topic is not None:
-        post.topic = _normalize_cohort_value(topic)
-    if content_format is not None:
-        post.content_format = _normalize_cohort_value(content_format)
-    if hook_style is not None:
-        post.hook_style = _normalize_cohort_value(hook_style)
-    if length_bucket is not None:
-        post.length_bucket = _normalize_cohort_value(length_bucket)
-    if post_hour is not None:
-        post.post_hour = post_hour
-    if content is not None:
-        post.content = content if content else None
-    if status is not None:
-        post.status = status
-
-    post.recalculate_engagement_rate()
-    db.commit()
-    db.refresh(post)
+    # attribute -> (value sent, normalizer). None means the field was not sent;
+    # empty strings clear the nullable text fields.
+    def blank_to_none(value: str) -> str | None:
+        return value or None
+
+    fields: dict[str, tuple[Any, Any]] = {
+        "draft_id": (draft_id, blank_to_none),
+        "title": (title, blank_to_none),
+        "impressions": (impressions, None),
+        "reactions": (reactions, None),
+        "comments": (comments, None),
+        "shares": (shares, None),
+        "clicks": (clicks, None),
+        "topic": (topic, _normalize_cohort_value),
+        "content_format": (content_format, _normalize_cohort_value),
+        "hook_style": (hook_style, _normalize_cohort_value),
+        "length_bucket": (length_bucket, _normalize_cohort_value),
+        "post_hour": (post_hour, None),
+        "content": (content, blank_to_none),
+        "status": (status, None),
+    }
+    changed: set[str] = set()
+    for attr, (value, normalize) in fields.items():
+        if value is None:
+            continue
+        if normalize is not None:
+            value = normalize(value)
+        if getattr(post, attr) != value:
+            setattr(post, attr, value)
+            changed.add(attr)
 
-    return {
+    if changed & _ENGAGEMENT_RATE_INPUTS:
+        post.recalculate_engagement_rate()
+
+    # Built before committing: every field is already current in memory, so
+    # the commit's attribute expiry does not force a re-SELECT.
+    payload = {
         "id": post.id,
         "draft_id": post.draft_id,
         "title": post.title,
@@ -477,6 +734,13 @@ async def update_post(
         "status": post.status,
     }
 
+    # A no-op PATCH skips the write transaction and cache invalidation.
+    if changed:
+        db.commit()
+        invalidate_metrics_cache()
+
+    return payload
+
 
 # ---------------------------------------------------------------------------
 # Cohort / analytics helpers
@@ -494,49 +758,57 @@ def _normalize_cohort_value(value: str) -> str | None:
     return normalized if normalized else None
 
 
-def _compute_rolling_avg(posts: list[Post], window: int = 5) -> list[float]:
-    """Compute rolling average of engagement_rate over a sorted list of posts.
+def _compute_rolling_avg(rates: list[float], window: int = 5) -> list[float]:
+    """Compute rolling average of engagement rates ordered by post date.
 
     For the first N posts where N < window, averages over all available posts
-    up to that point.
+    up to that point. Keeps a running window sum, so each post costs one add
+    and one subtract rather than re-summing its window.
     """
     result = []
-    for i, post in enumerate(posts):
-        start = max(0, i - window + 1)
-        window_posts = posts[start : i + 1]
-        avg = sum((p.engagement_rate or 0.0) for p in window_posts) / len(window_posts)
-        result.append(round(avg, 6))
+    window_sum = 0.0
+    for i, rate in enumerate(rates):
+        window_sum += rate
+        if i >= window:
+            window_sum -= rates[i - window]
+        result.append(round(window_sum / min(i + 1, window), 6))
     return result
 
 
 def _compute_top_10pct_threshold(engagement_rates: list[float]) -> float:
-    """Return the engagement rate at the 90th percentile (top 10% threshold)."""
+    """Return the engagement rate at the 90th percentile (top 10% threshold).
+
+    Only the top decile is ordered: heapq.nlargest keeps a heap of that size
+    instead of sorting the full list.
+    """
     if not engagement_rates:
         return 0.0
-    sorted_rates = sorted(engagement_rates)
-    idx = math.ceil(len(sorted_rates) * 0.9) - 1
-    return sorted_rates[max(0, idx)]
+    idx = max(0, math.ceil(len(engagement_rates) * 0.9) - 1)
+    return heapq.nlargest(len(engagement_rates) - idx, engagement_rates)[-1]
+
 
+def _compute_monthly_medians(
+    posts: list[Post], rates: list[float], scores: list[float]
+) -> list[dict]:
+    """Group posts by YYYY-MM and compute median engagement rate and weighted score per month.
 
-def _compute_monthly_medians(posts: list[Post]) -> list[dict]:
-    """Group posts by YYYY-MM and compute median engagement rate and weighted score per month."""
-    by_month: dict[str, list[Post]] = defaultdict(list)
-    for p in posts:
-        key = p.post_date.strftime("%Y-%m")
-        by_month[key].append(p)
+    rates and scores run parallel to posts, so each post's metrics are read
+    from the ORM object only once by the caller.
+    """
+    by_month: dict[str, tuple[list[float], list[float]]] = defaultdict(lambda: ([], []))
+    for p, rate, score in zip(posts, rates, scores):
+        month_rates, month_scores = by_month[p.post_date.isoformat()[:7]]
+        month_rates.append(rate)
+        month_scores.append(score)
 
     return [
         {
             "month": month,
-            "median_engagement_rate": round(
-                statistics.median((p.engagement_rate or 0.0) for p in month_posts), 6
-            ),
-            "median_weighted_score": round(
-                statistics.median(p.weighted_score for p in month_posts), 6
-            ),
-            "post_count": len(month_posts),
+            "median_engagement_rate": round(statistics.median(month_rates), 6),
+            "median_weighted_score": round(statistics.median(month_scores), 6),
+            "post_count": len(month_rates),
         }
-        for month, month_posts in sorted(by_month.items())
+        for month, (month_rates, month_scores) in sorted(by_month.items())
     ]
 
 
@@ -549,7 +821,7 @@ def _compute_monthly_medians(posts: list[Post]) -> list[dict]:
 async def analytics_engagement(
     days: int = Query(365, ge=30, le=1825),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """Return engagement rate time series, rolling average, monthly medians,
     top 10% threshold, and baseline vs last 30 days comparison.
 
@@ -563,78 +835,93 @@ async def analytics_engagement(
     cutoff = date.today() - timedelta(days=days)
     last_30d_cutoff = date.today() - timedelta(days=30)
 
+    # Only the columns the payload needs: display_title and weighted_score
+    # are computed from these, and content/notes are never touched.
     all_posts = (
         db.query(Post)
+        .options(
+            load_only(
+                Post.id,
+                Post.post_date,
+                Post.title,
+                Post.draft_id,
+                Post.linkedin_post_id,
+                Post.engagement_rate,
+                Post.impressions,
+                Post.reactions,
+                Post.comments,
+                Post.shares,
+            )
+        )
         .filter(Post.post_date >= cutoff)
         .order_by(Post.post_date)
         .all()
     )
 
-    rolling_avgs = _compute_rolling_avg(all_posts)
+    # Read each post's metrics once; every helper below works on these lists.
     engagement_rates = [p.engagement_rate or 0.0 for p in all_posts]
-    threshold = _compute_top_10pct_threshold(engagement_rates)
-    monthly_medians = _compute_monthly_medians(all_posts)
-
-    # Baseline: all posts in lookback window
-    baseline_posts = all_posts
-    baseline_count = len(baseline_posts)
-    if baseline_count > 0:
-        baseline_avg_er = round(
-            sum(p.engagement_rate or 0.0 for p in baseline_posts) / baseline_count, 6
-        )
-        baseline_avg_ws = round(
-            sum(p.weighted_score for p in baseline_posts) / baseline_count, 6
-        )
-    else:
-        baseline_avg_er = 0.0
-        baseline_avg_ws = 0.0
-
-    # Last 30 days
-    last_30d_posts = [p for p in all_posts if p.post_date >= last_30d_cutoff]
-    last_30d_count = len(last_30d_posts)
-    if last_30d_count > 0:
-        last_30d_avg_er = round(
-            sum(p.engagement_rate or 0.0 for p in last_30d_posts) / last_30d_count, 6
-        )
-        last_30d_avg_ws = round(
-            sum(p.weighted_score for p in last_30d_posts) / last_30d_count, 6
-        )
-    else:
-        last_30d_avg_er = 0.0
-        last_30d_avg_ws = 0.0
+    weighted_scores = [p.weighted_score for p in all_posts]
 
-    post_data = [
-        {
-            "id": p.id,
-            "post_date": str(p.post_date),
-            "title": p.display_title,
-            "engagement_rate": round(p.engagement_rate or 0.0, 6),
-            "weighted_score": round(p.weighted_score, 6),
-            "rolling_avg_5": rolling_avgs[i],
-            "impressions": p.impressions,
-            "reactions": p.reactions,
-            "comments": p.comments,
-            "shares": p.shares,
-        }
-        for i, p in enumerate(all_posts)
-    ]
+    rolling_avgs = _compute_rolling_avg(engagement_rates)
+    threshold = _compute_top_10pct_threshold(engagement_rates)
+    monthly_medians = _compute_monthly_medians(all_posts, engagement_rates, weighted_scores)
+
+    # Baseline (whole window) and last-30-day averages, aggregated by SQLite
+    # in one statement; AVG over a CASE without ELSE skips older posts.
+    er = func.coalesce(Post.engagement_rate, 0.0)
+    ws = Post.weighted_score
+    in_last_30d = Post.post_date >= last_30d_cutoff
+    (
+        baseline_count,
+        baseline_avg_er,
+        baseline_avg_ws,
+        last_30d_count,
+        last_30d_avg_er,
+        last_30d_avg_ws,
+    ) = db.execute(
+        select(
+            func.count(),
+            func.avg(er),
+            func.avg(ws),
+            func.count(case((in_last_30d, 1))),
+            func.avg(case((in_last_30d, er))),
+            func.avg(case((in_last_30d, ws))),
+        ).where(Post.post_date >= cutoff)
+    ).one()
+
+    # Columnar (one array per field) rather than a dict per post: Chart.js
+    # consumes whole series, and keys are not repeated for every post.
+    post_data = {
+        "id": [p.id for p in all_posts],
+        "post_date": [str(p.post_date) for p in all_posts],
+        "title": [p.display_title for p in all_posts],
+        "engagement_rate": [round(rate, 6) for rate in engagement_rates],
+        "weighted_score": [round(score, 6) for score in weighted_scores],
+        "rolling_avg_5": rolling_avgs,
+        "impressions": [p.impressions for p in all_posts],
+        "reactions": [p.reactions for p in all_posts],
+        "comments": [p.comments for p in all_posts],
+        "shares": [p.shares for p in all_posts],
+    }
 
-    return {
+    # Returned as a response object so FastAPI skips validating and
+    # jsonable_encoder-walking the per-post list before orjson serializes it.
+    return ORJSONResponse({
         "posts": post_data,
         "monthly_medians": monthly_medians,
         "top_10pct_threshold": round(threshold, 6),
         "baseline": {
-            "avg_engagement_rate": baseline_avg_er,
-            "avg_weighted_score": baseline_avg_ws,
+            "avg_engagement_rate": round(baseline_avg_er or 0.0, 6),
+            "avg_weighted_score": round(baseline_avg_ws or 0.0, 6),
             "post_count": baseline_count,
         },
         "last_30d": {
-            "avg_engagement_rate": last_30d_avg_er,
-            "avg_weighted_score": last_30d_avg_ws,
+            "avg_engagement_rate": round(last_30d_avg_er or 0.0, 6),
+            "avg_weighted_score": round(last_30d_avg_ws or 0.0, 6),
             "post_count": last_30d_count,
         },
         "period_days": days,
-    }
+    })
 
 
 @router.get("/api/analytics/cohorts")
@@ -644,7 +931,7 @@ async def analytics_cohorts(
         pattern="^(topic|content_format|hook_style|length_bucket|post_hour)$",
     ),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """Return engagement metrics grouped by a cohort dimension.
 
     Only posts with the requested dimension populated are included.
@@ -666,43 +953,65 @@ async def analytics_cohorts(
     }
     col = dimension_map[dimension]
 
-    posts = (
-        db.query(Post)
-        .filter(col.isnot(None))
-        .order_by(Post.post_date)
-        .all()
+    # SQLite groups and aggregates the posts; only one row per cohort comes
+    # back. Window functions rank each cohort's posts by engagement rate:
+    # ascending for the median (the mean of the middle one or two ranks, as
+    # statistics.median does) and descending for the best post (earliest
+    # post on ties).
+    er = func.coalesce(Post.engagement_rate, 0.0)
+    ranked = (
+        select(
+            col.label("value"),
+            Post.id.label("post_id"),
+            er.label("er"),
+            Post.weighted_score.label("ws"),
+            func.row_number().over(partition_by=col, order_by=(er, Post.id)).label("er_rank"),
+            func.row_number()
+            .over(partition_by=col, order_by=(er.desc(), Post.post_date, Post.id))
+            .label("best_rank"),
+            func.count().over(partition_by=col).label("n"),
+        )
+        .where(col.isnot(None))
+        .subquery()
     )
-
-    # Group by dimension value
-    by_value: dict[str, list[Post]] = defaultdict(list)
-    for p in posts:
-        key = str(getattr(p, dimension))
-        by_value[key].append(p)
+    middle_ranks = ((ranked.c.n + 1) // 2, ranked.c.n // 2 + 1)
+    rows = db.execute(
+        select(
+            ranked.c.value,
+            func.count(),
+            func.avg(ranked.c.er),
+            func.avg(ranked.c.ws),
+            func.avg(case((ranked.c.er_rank.in_(middle_ranks), ranked.c.er))),
+            func.max(case((ranked.c.best_rank == 1, ranked.c.post_id))),
+        ).group_by(ranked.c.value)
+    ).all()
+
+    # display_title needs a few columns of each cohort's best post.
+    best_posts = {
+        p.id: p
+        for p in db.query(Post)
+        .options(
+            load_only(Post.id, Post.post_date, Post.title, Post.draft_id, Post.linkedin_post_id)
+        )
+        .filter(Post.id.in_([row[5] for row in rows]))
+    }
 
     cohorts = []
-    for value, group in sorted(by_value.items()):
-        er_values = [p.engagement_rate or 0.0 for p in group]
-        ws_values = [p.weighted_score for p in group]
-        avg_er = round(sum(er_values) / len(er_values), 6)
-        avg_ws = round(sum(ws_values) / len(ws_values), 6)
-        median_er = round(statistics.median(er_values), 6)
-
-        # Best post: highest engagement_rate in this cohort
-        best_post = max(group, key=lambda p: p.engagement_rate or 0.0)
-
+    for value, count, avg_er, avg_ws, median_er, best_id in sorted(rows, key=lambda r: str(r[0])):
+        best_post = best_posts[best_id]
         cohorts.append(
             {
-                "value": value,
-                "post_count": len(group),
-                "avg_engagement_rate": avg_er,
-                "avg_weighted_score": avg_ws,
-                "median_engagement_rate": median_er,
+                "value": str(value),
+                "post_count": count,
+                "avg_engagement_rate": round(avg_er, 6),
+                "avg_weighted_score": round(avg_ws, 6),
+                "median_engagement_rate": round(median_er, 6),
                 "best_post_id": best_post.id,
                 "best_post_title": best_post.display_title,
             }
         )
 
-    return {"dimension": dimension, "cohorts": cohorts}
+    return ORJSONResponse({"dimension": dimension, "cohorts": cohorts})
 
 
 # ---------------------------------------------------------------------------
@@ -710,6 +1019,25 @@ async def analytics_cohorts(
 # ---------------------------------------------------------------------------
 
 
+# Leading YAML frontmatter block (--- ... ---) in draft markdown files.
+_FRONTMATTER_RE = _re.compile(r"\A---\s*\n.*?\n---\s*\n", _re.DOTALL)
+
+# Stripped draft contents keyed by resolved path, each stored with the file's
+# (st_mtime_ns, st_size) so an edited draft is re-read on the next request.
+_draft_content_cache: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+_DRAFT_CONTENT_CACHE_MAX_ENTRIES = 64
+
+
+@lru_cache(maxsize=8)
+def _resolved_drafts_root(drafts_dir: Path) -> str:
+    """Return the resolved drafts directory with a trailing separator.
+
+    Keyed on the configured path so a changed setting resolves afresh, while
+    repeated reads of the same directory skip the realpath walk.
+    """
+    return os.path.join(os.path.realpath(drafts_dir), "")
+
+
 def _strip_frontmatter(text: str) -> str:
     """Strip YAML frontmatter from markdown content.
 
@@ -717,14 +1045,20 @@ def _strip_frontmatter(text: str) -> str:
     Draft files from the content pipeline may have frontmatter that
     should not be published to LinkedIn.
     """
-    stripped = _re.sub(
-        r"\A---\s*\n.*?\n---\s*\n",
-        "",
-        text,
-        count=1,
-        flags=_re.DOTALL,
-    )
-    return stripped.lstrip()
+    return _FRONTMATTER_RE.sub("", text, count=1).lstrip()
+
+
+# Review/supplementary files that sit next to drafts but are not drafts.
+_DRAFT_EXCLUDE_SUFFIXES = (
+    ".copy-review.md",
+    ".sensitivity-review.md",
+    ".review-summary.md",
+    ".visual-specs.md",
+)
+
+# Last draft listing, stored as ((drafts_dir, dir st_mtime_ns), drafts).
+_drafts_list_cache: tuple[tuple[Path, int], list[dict[str, Any]]] | None = None
+_DRAFTS_DIR_SETTLE_NS = 1_000_000_000
 
 
 def list_draft_files() -> list[dict[str, Any]]:
@@ -733,34 +1067,49 @@ def list_draft_files() -> list[dict[str, Any]]:
     Returns a list of dicts with keys: draft_id, filename, path, title.
     Filters out review/supplementary files (*.copy-review.md, etc.).
     """
+    global _drafts_list_cache
     drafts_dir = settings.drafts_dir
-    if not drafts_dir.exists():
+    try:
+        dir_mtime_ns = drafts_dir.stat().st_mtime_ns
+    except OSError:
         return []
-
-    exclude_suffixes = {
-        ".copy-review.md",
-        ".sensitivity-review.md",
-        ".review-summary.md",
-        ".visual-specs.md",
-    }
+    # Adding, removing or renaming a file bumps the directory's mtime, and
+    # the listing depends on nothing else.
+    cache_key = (drafts_dir, dir_mtime_ns)
+    if _drafts_list_cache is not None and _drafts_list_cache[0] == cache_key:
+        return list(_drafts_list_cache[1])
+
+    # scandir yields names with the file type from the directory read itself;
+    # no Path objects, fnmatch, or per-entry stat.
+    with os.scandir(drafts_dir) as it:
+        names = sorted(
+            e.name
+            for e in it
+            if e.name.endswith(".md")
+            and not e.name.endswith(_DRAFT_EXCLUDE_SUFFIXES)
+            and e.is_file()
+        )
 
     drafts: list[dict[str, Any]] = []
-    for f in sorted(drafts_dir.glob("*.md")):
-        if any(f.name.endswith(suffix) for suffix in exclude_suffixes):
-            continue
-
-        parts = f.stem.split("-", 1)
+    for name in names:
+        stem = name[:-3]
+        parts = stem.split("-", 1)
         draft_id = parts[0] if parts[0].isdigit() else None
-        title = parts[1].replace("-", " ").title() if len(parts) > 1 else f.stem
+        title = parts[1].replace("-", " ").title() if len(parts) > 1 else stem
 
         drafts.append({
             "draft_id": draft_id,
-            "filename": f.name,
-            "path": str(f),
+            "filename": name,
+            "path": os.path.join(drafts_dir, name),
             "title": title,
         })
 
-    return drafts
+    # Directory mtimes tick at kernel-clock granularity, so a file added in
+    # the same tick as this scan would not change the key. Only cache once
+    # the directory has been quiet for a moment.
+    if time.time_ns() - dir_mtime_ns > _DRAFTS_DIR_SETTLE_NS:
+        _drafts_list_cache = (cache_key, drafts)
+    return list(drafts)
 
 
 def read_draft_file(filename: str) -> str | None:
@@ -775,17 +1124,23 @@ def read_draft_file(filename: str) -> str | None:
     Returns:
         Frontmatter-stripped file content, or None if inaccessible.
     """
-    drafts_dir = settings.drafts_dir
-    target = (drafts_dir / filename).resolve()
-    try:
-        if not target.is_relative_to(drafts_dir.resolve()):
-            return None
-    except ValueError:
+    root = _resolved_drafts_root(settings.drafts_dir)
+    target = os.path.realpath(os.path.join(root, filename))
+    if not target.startswith(root):
         return None
-    if not target.exists():
+    try:
+        st = os.stat(target)
+    except OSError:
         return None
-    raw = target.read_text(encoding="utf-8")
-    return _strip_frontmatter(raw)
+    cached = _draft_content_cache.get(target)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(target, encoding="utf-8") as fh:
+        content = _strip_frontmatter(fh.read())
+    if len(_draft_content_cache) >= _DRAFT_CONTENT_CACHE_MAX_ENTRIES:
+        _draft_content_cache.popitem(last=False)
+    _draft_content_cache[target] = (st.st_mtime_ns, st.st_size, content)
+    return content
 
 
 # ---------------------------------------------------------------------------
@@ -809,7 +1164,7 @@ async def get_draft(filename: str) -> dict[str, Any]:
     """Read a draft file's content (frontmatter stripped).
 
     Path traversal is prevented by resolving the path and checking
-    it is within the configured drafts directory using Path.is_relative_to().
+    it starts with the resolved drafts directory.
 
     Args:
         filename: Bare filename of the draft (e.g., "001-commitment.md").
@@ -859,42 +1214,71 @@ async def get_draft(filename: str) -> dict[str, Any]:
 # Publish endpoint (CSRF protected)
 # ---------------------------------------------------------------------------
 
-# Server-side dedup cache: content_hash -> timestamp
-# Entries expire after 60 seconds. Max 100 entries.
-_publish_dedup_cache: OrderedDict[str, float] = OrderedDict()
+# Server-side dedup cache. _publish_dedup_order holds (content_hash, timestamp)
+# oldest first, so expiry pops from the left; _publish_dedup_keys answers
+# membership. Entries expire after 60 seconds. Max 100 entries.
+_publish_dedup_order: deque[tuple[bytes, float]] = deque()
+_publish_dedup_keys: set[bytes] = set()
 _DEDUP_WINDOW_SECONDS = 60
+_DEDUP_MAX_ENTRIES = 100
 _PUBLISH_NONCE_COOKIE = "publish_nonce"
 
+# Visibility values accepted by the publish endpoint; anything else falls
+# back to PUBLIC.
+_ALLOWED_VISIBILITY = frozenset({"PUBLIC", "CONNECTIONS"})
+
+# Upper bound on a publish request body. 3000 characters of post text is at
+# most ~18 KB even if every character arrives as a JSON \uXXXX escape, so this
+# leaves room for the other fields while refusing oversized bodies before
+# they are buffered and parsed.
+_PUBLISH_MAX_BODY_BYTES = 64 * 1024
 
-def _check_dedup(content_hash: str) -> bool:
+
+def _check_dedup(content_hash: bytes) -> bool:
     """Check if this content was published in the last 60 seconds.
 
     Returns True if duplicate detected (should reject).
     Purges expired entries on each call.
     """
-    now = time.time()
-    while _publish_dedup_cache:
-        oldest_key, oldest_time = next(iter(_publish_dedup_cache.items()))
-        if now - oldest_time > _DEDUP_WINDOW_SECONDS:
-            _publish_dedup_cache.pop(oldest_key)
-        else:
-            break
-    if content_hash in _publish_dedup_cache:
+    now = time.monotonic()
+    while _publish_dedup_order and now - _publish_dedup_order[0][1] > _DEDUP_WINDOW_SECONDS:
+        _publish_dedup_keys.discard(_publish_dedup_order.popleft()[0])
+    if content_hash in _publish_dedup_keys:
         return True
     # Evict oldest entry if at capacity
-    if len(_publish_dedup_cache) >= 100:
-        _publish_dedup_cache.popitem(last=False)
-    _publish_dedup_cache[content_hash] = now
+    if len(_publish_dedup_order) >= _DEDUP_MAX_ENTRIES:
+        _publish_dedup_keys.discard(_publish_dedup_order.popleft()[0])
+    _publish_dedup_order.append((content_hash, now))
+    _publish_dedup_keys.add(content_hash)
     return False
 
 
+async def _read_bounded_body(request: Request, limit: int) -> bytes:
+    """Read the request body, rejecting it with 413 once it exceeds limit.
+
+    A declared Content-Length over the limit is refused without reading;
+    otherwise the stream is read incrementally so an undeclared or
+    understated length is caught as soon as it passes the limit.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail="Request body too large.")
+    chunks: list[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Request body too large.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
 def generate_publish_nonce_cookie(response: Any) -> str:
     """Generate a publish nonce, set it as a cookie, and return the value.
 
     Called by the compose route to set up CSRF protection for the publish
     form before rendering the page.
     """
-    import secrets
     nonce = secrets.token_urlsafe(32)
     response.set_cookie(
         key=_PUBLISH_NONCE_COOKIE,
@@ -910,7 +1294,7 @@ def generate_publish_nonce_cookie(response: Any) -> str:
 async def publish_post(
     request: Request,
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """Publish a text post to LinkedIn and store locally.
 
     Request body (JSON):
@@ -930,19 +1314,22 @@ async def publish_post(
         HTTPException 401: If not connected to LinkedIn.
         HTTPException 403: If CSRF validation fails or w_member_social scope missing.
         HTTPException 409: If duplicate publish detected.
+        HTTPException 413: If the request body exceeds 64 KiB.
         HTTPException 429: If LinkedIn rate limited.
         HTTPException 502: If LinkedIn API call fails.
     """
     try:
-        body = await request.json()
-    except Exception:
+        body = orjson.loads(await _read_bounded_body(request, _PUBLISH_MAX_BODY_BYTES))
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON request body.")
+    if not isinstance(body, dict):
         raise HTTPException(status_code=400, detail="Invalid JSON request body.")
 
     text: str = body.get("text", "").strip()
     title: str | None = body.get("title") or None
     draft_id: str | None = body.get("draft_id") or None
     post_id: int | None = body.get("post_id") or None
-    visibility: str = body.get("visibility", "PUBLIC")
+    visibility: str = str(body.get("visibility") or "PUBLIC").strip().upper()
     save_as_draft: bool = bool(body.get("save_as_draft", False))
     csrf_token: str | None = body.get("csrf_token") or None
 
@@ -956,14 +1343,17 @@ async def publish_post(
         )
 
     # Validate visibility
-    if visibility not in ("PUBLIC", "CONNECTIONS"):
+    if visibility not in _ALLOWED_VISIBILITY:
         visibility = "PUBLIC"
 
     # --- Save as draft (no CSRF required, no LinkedIn API call) ---
+    # Neither saving nor publishing touches impressions/reactions/comments/
+    # shares, so this handler leaves engagement_rate alone: existing rows keep
+    # their value and new rows take the column default of 0.0.
     if save_as_draft:
         auto_title = title or text[:100]
         if post_id:
-            existing = db.query(Post).filter(Post.id == post_id).first()
+            existing = db.get(Post, post_id)
             if not existing:
                 raise HTTPException(status_code=404, detail=f"Post {post_id} not found.")
             existing.content = text
@@ -972,64 +1362,58 @@ async def publish_post(
                 existing.draft_id = draft_id
             if not existing.status or existing.status == "draft":
                 existing.status = "draft"
-            existing.recalculate_engagement_rate()
-            db.commit()
-            db.refresh(existing)
-            return {
+            # Built before commit, which expires the instance; reading it
+            # afterwards would cost a re-SELECT.
+            payload = {
                 "id": existing.id,
                 "status": existing.status,
                 "title": existing.title,
                 "linkedin_url": existing.post_url,
             }
+            db.commit()
+            invalidate_metrics_cache()
+            return ORJSONResponse(payload)
         else:
-            from datetime import date as _date
             post = Post(
-                post_date=_date.today(),
+                post_date=date.today(),
                 title=auto_title,
                 content=text,
                 status="draft",
                 draft_id=draft_id,
             )
-            post.recalculate_engagement_rate()
             db.add(post)
-            db.commit()
-            db.refresh(post)
-            return {
+            db.flush()  # Assigns post.id without a post-commit reload
+            payload = {
                 "id": post.id,
                 "status": post.status,
                 "title": post.title,
                 "linkedin_url": None,
             }
+            db.commit()
+            invalidate_metrics_cache()
+            return ORJSONResponse(payload)
 
     # --- Full publish flow ---
 
     # CSRF validation (nonce cookie + HMAC, same pattern as disconnect)
-    from app.oauth import generate_disconnect_csrf_token, verify_disconnect_csrf_token
     nonce = request.cookies.get(_PUBLISH_NONCE_COOKIE)
     if not csrf_token or not nonce:
         raise HTTPException(
             status_code=403,
             detail="Missing CSRF token. Please reload the compose page and try again.",
         )
-    # Reuse the same HMAC helper with a different prefix to avoid token reuse
-    from app.config import settings as _settings
-    import hmac as _hmac
-    import hashlib as _hashlib
-    key = _settings.token_encryption_key.encode()
-    message = f"publish:{nonce}".encode()
-    expected = _hmac.new(key, message, _hashlib.sha256).hexdigest()
-    if not _hmac.compare_digest(expected, csrf_token):
+    if not oauth.verify_publish_csrf_token(nonce, csrf_token):
         raise HTTPException(status_code=403, detail="Invalid CSRF token.")
 
-    # Check OAuth connection
-    from app.models import OAuthToken
-    token_row = db.query(OAuthToken).filter(OAuthToken.provider == "linkedin").first()
+    # Check OAuth connection. get_token_row leaves the row in this session's
+    # identity map, so get_valid_access_token below reuses it without a
+    # second SELECT.
+    token_row = oauth.get_token_row(db)
     if not token_row:
         raise HTTPException(status_code=401, detail="Not connected to LinkedIn. Connect in Settings.")
 
     # Pre-flight scope check
-    stored_scopes = token_row.scopes.split() if token_row.scopes else []
-    if "w_member_social" not in stored_scopes:
+    if not token_row.has_scope("w_member_social"):
         raise HTTPException(
             status_code=403,
             detail=(
@@ -1048,17 +1432,28 @@ async def publish_post(
             ),
         )
 
-    # Idempotency check (60-second window)
-    content_hash = hashlib.sha256(text.encode()).hexdigest()
+    # Resolve the post being published before calling LinkedIn, so an unknown
+    # post_id fails without creating a LinkedIn post that has no local row.
+    post = None
+    if post_id:
+        post = db.get(Post, post_id)
+        if not post:
+            raise HTTPException(status_code=404, detail=f"Post {post_id} not found.")
+
+    # Idempotency check (60-second window). The key never leaves this process,
+    # so it uses BLAKE2b, which outpaces SHA-256 in software.
+    content_hash = hashlib.blake2b(text.encode(), digest_size=16).digest()
     if _check_dedup(content_hash):
         raise HTTPException(
             status_code=409,
             detail="Duplicate publish detected. Please wait 60 seconds before publishing the same content.",
         )
 
-    # Get valid access token
-    from app.oauth import get_valid_access_token
-    access_token = get_valid_access_token(db)
+    # Get valid access token. This is blocking work (a DB read and, near
+    # expiry, a synchronous token refresh against LinkedIn), so it runs in a
+    # worker thread rather than stalling the event loop. The session is not
+    # used elsewhere while the thread holds it.
+    access_token = await asyncio.to_thread(oauth.get_valid_access_token, db)
     if not access_token:
         raise HTTPException(
             status_code=401,
@@ -1069,9 +1464,8 @@ async def publish_post(
     member_urn = f"urn:li:person:{token_row.linkedin_member_id}"
 
     # Publish to LinkedIn
-    from app.linkedin_client import LinkedInAPIError, LinkedInRateLimitError, create_post
     try:
-        result = await create_post(access_token, member_urn, text, visibility)
+        result = await linkedin_client.create_post(access_token, member_urn, text, visibility)
     except LinkedInRateLimitError as e:
         raise HTTPException(
             status_code=429,
@@ -1086,13 +1480,9 @@ async def publish_post(
         raise HTTPException(status_code=400, detail=str(e))
 
     # Store the post in the database
-    from datetime import date as _date
     auto_title = title or text[:100]
 
-    if post_id:
-        post = db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            raise HTTPException(status_code=404, detail=f"Post {post_id} not found.")
+    if post is not None:
         post.linkedin_post_id = result.activity_id
         post.post_url = result.post_url
         post.content = text
@@ -1100,11 +1490,10 @@ async def publish_post(
         post.title = auto_title
         if draft_id is not None:
             post.draft_id = draft_id
-        post.post_date = _date.today()
-        post.recalculate_engagement_rate()
+        post.post_date = date.today()
     else:
         post = Post(
-            post_date=_date.today(),
+            post_date=date.today(),
             title=auto_title,
             linkedin_post_id=result.activity_id,
             post_url=result.post_url,
@@ -1112,27 +1501,30 @@ async def publish_post(
             status="published",
             draft_id=draft_id,
         )
-        post.recalculate_engagement_rate()
         db.add(post)
 
+    # Flush for the id and build the reply before commit expires the
+    # instance, so no re-SELECT is needed afterwards.
+    db.flush()
+    payload = {
+        "id": post.id,
+        "status": post.status,
+        "title": post.title,
+        "linkedin_post_id": result.activity_id,
+        "linkedin_url": result.post_url,
+        "post_urn": result.post_urn,
+    }
     db.commit()
-    db.refresh(post)
+    invalidate_metrics_cache()
 
     logger.info(
         "Post published: id=%d linkedin_post_id=%s url=%s",
-        post.id,
+        payload["id"],
         result.activity_id,
         result.post_url,
     )
 
-    return {
-        "id": post.id,
-        "status": post.status,
-        "title": post.title,
-        "linkedin_post_id": result.activity_id,
-        "linkedin_url": result.post_url,
-        "post_urn": result.post_urn,
-    }
+    return ORJSONResponse(payload)
 
 
 # ---------------------------------------------------------------------------
@@ -1140,15 +1532,22 @@ async def publish_post(
 # ---------------------------------------------------------------------------
 
 
+# Read size for hashing uploaded files (1 MiB, matching the single-file
+# upload route).
+_UPLOAD_READ_CHUNK = 1024 * 1024
+
+
 @router.post("/api/upload/batch")
-async def batch_upload(
+def batch_upload(
     files: list[UploadFile] = File(...),
     db: Session = Depends(get_session),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """Upload multiple per-post XLSX files at once.
 
     Each file is processed independently using per-post XLSX ingestion.
-    Partial failures do not block other files.
+    Partial failures do not block other files. Declared as a plain function
+    so FastAPI runs the workbook parsing and ingestion in its threadpool
+    instead of on the event loop.
 
     Args:
         files: List of uploaded XLSX files.
@@ -1156,109 +1555,149 @@ async def batch_upload(
     Returns:
         JSON with per-file results (successes and failures).
     """
-    import shutil
-    import tempfile
-
-    from app.ingest import (
-        DuplicateFileError,
-        IngestError,
-        compute_file_hash,
-        validate_upload,
-    )
-
     if not files:
         raise HTTPException(status_code=400, detail="No files provided.")
 
-    results: list[dict[str, Any]] = []
-
-    for upload_file in files:
+    results: list[dict[str, Any] | None] = [None] * len(files)
+    # (index, filename, file object, SHA256) for each file that passed
+    # validation. Starlette already spools each upload (in memory while small,
+    # on disk beyond that), so openpyxl reads the upload directly instead of
+    # a second copy written to a temporary file.
+    staged: list[tuple[int, str, BinaryIO, str]] = []
+
+    # Pass 1: hash and size-check every file, so duplicates can be checked
+    # for the whole batch with a single query. SHA256 keeps the digest
+    # comparable with compute_file_hash and the stored hashes.
+    for index, upload_file in enumerate(files):
         filename = upload_file.filename or "unknown.xlsx"
-        tmp_path = None
         try:
-            # Save to a temporary file
-            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-                shutil.copyfileobj(upload_file.file, tmp)
-                tmp_path = Path(tmp.name)
-
-            validate_upload(tmp_path)
-
-            import openpyxl
-            try:
-                wb = openpyxl.load_workbook(tmp_path, read_only=False, data_only=True)
-            except Exception as exc:
-                raise IngestError(f"Cannot open workbook: {exc}") from exc
-
-            from app.ingest import _detect_xlsx_format, ingest_per_post_xlsx
-            fmt = _detect_xlsx_format(wb)
-
-            if fmt == "per_post":
-                file_hash = compute_file_hash(tmp_path)
-                existing_upload = db.query(Upload).filter_by(file_hash=file_hash).first()
-                if existing_upload:
-                    wb.close()
-                    results.append({
-                        "filename": filename,
-                        "status": "duplicate",
-                        "message": f"Already imported on {existing_upload.upload_date}.",
-                    })
-                    continue
-
-                per_post_result = ingest_per_post_xlsx(db, wb)
-                wb.close()
-
-                upload_record = Upload(
-                    filename=filename,
-                    file_hash=file_hash,
-                    records_imported=1,
-                    status="completed",
-                )
-                db.add(upload_record)
-                db.commit()
-
-                results.append({
-                    "filename": filename,
-                    "status": "ok",
-                    "post_id": per_post_result["post_id"],
-                    "demographics_imported": per_post_result["demographics_imported"],
-                })
-            elif fmt == "aggregate":
-                wb.close()
-                results.append({
-                    "filename": filename,
-                    "status": "error",
-                    "message": "This file looks like an aggregate export. Use the main upload endpoint.",
-                })
-            else:
-                wb.close()
-                results.append({
-                    "filename": filename,
-                    "status": "error",
-                    "message": "Unrecognised XLSX format (expected PERFORMANCE + TOP DEMOGRAPHICS sheets).",
-                })
-
-        except IngestError as exc:
-            results.append({
-                "filename": filename,
-                "status": "error",
-                "message": str(exc),
-            })
+            hasher = hashlib.sha256()
+            size = 0
+            while chunk := upload_file.file.read(_UPLOAD_READ_CHUNK):
+                hasher.update(chunk)
+                size += len(chunk)
+                if size > MAX_FILE_SIZE_BYTES:
+                    break
+            validate_upload_size(size)
+            staged.append((index, filename, upload_file.file, hasher.hexdigest()))
         except Exception as exc:
-            logger.exception("Unexpected error processing %s", filename)
-            results.append({
-                "filename": filename,
-                "status": "error",
-                "message": "Unexpected error during processing.",
-            })
-        finally:
-            if tmp_path and tmp_path.exists():
-                tmp_path.unlink(missing_ok=True)
+            results[index] = _batch_error_result(filename, exc)
+
+    # Pass 2: one lookup for every hash already recorded in uploads.
+    imported_on: dict[str, Any] = {}
+    if staged:
+        hashes = {file_hash for *_, file_hash in staged}
+        imported_on.update(
+            db.execute(
+                select(Upload.file_hash, Upload.upload_date).where(Upload.file_hash.in_(hashes))
+            ).all()
+        )
+
+    # Pass 3: ingest the rest. Each file's post, demographics and Upload row
+    # are committed together, so a failure only loses that file.
+    imported_any = False
+    for index, filename, fileobj, file_hash in staged:
+        try:
+            results[index] = _ingest_batch_file(db, filename, fileobj, file_hash, imported_on)
+            if results[index]["status"] == "ok":
+                imported_any = True
+        except Exception as exc:
+            db.rollback()
+            results[index] = _batch_error_result(filename, exc)
+    if imported_any:
+        invalidate_metrics_cache()
 
     successes = sum(1 for r in results if r["status"] == "ok")
-    return {
+    return ORJSONResponse({
         "total": len(results),
         "succeeded": successes,
         "failed": len(results) - successes,
         "results": results,
+    })
+
+
+def _batch_error_result(filename: str, exc: Exception) -> dict[str, Any]:
+    """Build the batch-upload result entry for a file that failed."""
+    if isinstance(exc, IngestError):
+        message = str(exc)
+    else:
+        logger.exception("Unexpected error processing %s", filename)
+        message = "Unexpected error during processing."
+    return {"filename": filename, "status": "error", "message": message}
+
+
+def _ingest_batch_file(
+    db: Session,
+    filename: str,
+    fileobj: BinaryIO,
+    file_hash: str,
+    imported_on: dict[str, Any],
+) -> dict[str, Any]:
+    """Ingest one saved batch-upload file and return its result entry.
+
+    Args:
+        db: SQLAlchemy session.
+        filename: Original filename from the upload.
+        fileobj: The upload's validated file object.
+        file_hash: SHA256 of the file.
+        imported_on: Upload date by file hash for files already imported.
+            Updated with this file's hash once it is imported, so a repeat
+            within the same batch is reported as a duplicate.
+
+    Raises:
+        IngestError: If the workbook cannot be opened or ingested.
+    """
+    if file_hash in imported_on:
+        return {
+            "filename": filename,
+            "status": "duplicate",
+            "message": f"Already imported on {imported_on[file_hash]}.",
+        }
+
+    # Only the sheet names are needed to reject other formats, so the full
+    # (non-read-only) parse is paid for per-post files alone.
+    try:
+        fileobj.seek(0)
+        fmt = _detect_file_format(fileobj)
+        if fmt == "per_post":
+            fileobj.seek(0)
+            wb = openpyxl.load_workbook(fileobj, read_only=False, data_only=True, keep_links=False)
+    except Exception as exc:
+        raise IngestError(f"Cannot open workbook: {exc}") from exc
+
+    if fmt == "aggregate":
+        return {
+            "filename": filename,
+            "status": "error",
+            "message": "This file looks like an aggregate export. Use the main upload endpoint.",
+        }
+    if fmt != "per_post":
+        return {
+            "filename": filename,
+            "status": "error",
+            "message": "Unrecognised XLSX format (expected PERFORMANCE + TOP DEMOGRAPHICS sheets).",
+        }
+
+    try:
+        per_post_result = ingest_per_post_xlsx(db, wb, commit=False)
+    finally:
+        wb.close()
+
+    upload_record = Upload(
+        filename=filename,
+        file_hash=file_hash,
+        records_imported=1,
+        status="completed",
+    )
+    db.add(upload_record)
+    db.commit()
+    imported_on[file_hash] = upload_record.upload_date
+
+    return {
+        "filename": filename,
+        "status": "ok",
+        "post_id": per_post_result["post_id"],
+        "demographics_imported": per_post_result["demographics_imported"],
     }
 
 
@@ -1295,6 +1734,13 @@ async def export_db() -> FileResponse:
         src = sqlite3.connect(str(db_path))
         dst = sqlite3.connect(str(snapshot_path))
         try:
+            # The snapshot is a throwaway file that is deleted on any failure,
+            # so it needs neither a rollback journal nor fsyncs.
+            dst.execute("PRAGMA journal_mode=OFF")
+            dst.execute("PRAGMA synchronous=OFF")
+            # Copy in a single step: the source runs in WAL mode, where this
+            # read does not block writers, whereas a stepped backup restarts
+            # from scratch whenever another connection writes between steps.
             src.backup(dst)
         finally:
             dst.close()
@@ -1318,8 +1764,6 @@ async def export_db() -> FileResponse:
 
 def _delete_file_task(path: Path):
     """Return a BackgroundTask that deletes the given file."""
-    from starlette.background import BackgroundTask
-
     def _delete():
         try:
             path.unlink(missing_ok=True)
@@ -8,11 +8,11 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import desc, func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.config import settings
 from app.database import get_session
-from app.models import DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, PostDemographic, Upload
+from app.models import DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, Upload
 
 logger = logging.getLogger(__name__)
 
@@ -104,17 +104,14 @@ async def post_detail(
     Raises:
         HTTPException 404: If the post is not found.
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = db.get(
+        Post,
+        post_id,
+        options=[selectinload(Post.daily_metrics), selectinload(Post.demographics)],
+    )
     if not post:
         raise HTTPException(status_code=404, detail=f"Post {post_id} not found.")
 
-    daily_metrics = (
-        db.query(DailyMetric)
-        .filter(DailyMetric.post_id == post_id)
-        .order_by(DailyMetric.metric_date)
-        .all()
-    )
-
     # Surrounding posts for navigation
     prev_post = (
         db.query(Post)
@@ -129,16 +126,10 @@ async def post_detail(
         .first()
     )
 
-    # Per-post demographics (from per-post XLSX imports)
-    post_demographics = (
-        db.query(PostDemographic)
-        .filter(PostDemographic.post_id == post_id)
-        .order_by(PostDemographic.category, PostDemographic.percentage.desc())
-        .all()
-    )
-    # Group demographics by category for the template
+    # Group per-post demographics (from per-post XLSX imports) by category
+    # for the template
     demo_by_category: dict[str, list] = {}
-    for d in post_demographics:
+    for d in post.demographics:
         d_display = type("DemoDisplay", (), {
             "category": d.category,
             "value": d.value,
@@ -151,7 +142,7 @@ async def post_detail(
         "post_detail.html",
         {
             "post": post,
-            "daily_metrics": daily_metrics,
+            "daily_metrics": post.daily_metrics,
             "prev_post": prev_post,
             "next_post": next_post,
             "demo_by_category": demo_by_category,
@@ -265,10 +256,8 @@ async def compose(
     for pre-loading (frontmatter stripped).
     If ?post_id=N is provided, pre-loads a saved draft post for editing.
     """
-    from app.oauth import get_auth_status
+    from app.oauth import generate_publish_csrf_token, get_auth_status
     from app.routes.api import list_draft_files, read_draft_file
-    import hashlib as _hashlib
-    import hmac as _hmac
     import secrets as _secrets
 
     auth_status = None
@@ -283,10 +272,8 @@ async def compose(
 
     # Generate publish CSRF nonce and token before rendering.
     nonce = _secrets.token_urlsafe(32)
-    key = settings.token_encryption_key.encode() if settings.token_encryption_key else b""
-    if key:
-        message = f"publish:{nonce}".encode()
-        publish_csrf_token = _hmac.new(key, message, _hashlib.sha256).hexdigest()
+    if settings.token_encryption_key:
+        publish_csrf_token = generate_publish_csrf_token(nonce)
     else:
         publish_csrf_token = ""
 
@@ -305,7 +292,7 @@ async def compose(
     # Load existing draft post if post_id provided
     existing_post = None
     if post_id:
-        existing_post = db.query(Post).filter(Post.id == post_id).first()
+        existing_post = db.get(Post, post_id)
         if existing_post:
             prefill_content = prefill_content or existing_post.content or ""
             prefill_title = prefill_title or existing_post.title or ""
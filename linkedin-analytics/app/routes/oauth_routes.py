@@ -9,7 +9,9 @@ Routes:
 
 import logging
 import secrets
+from functools import partial
 
+from anyio import to_thread
 from fastapi import APIRouter, Depends, Form, Request, Response
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
@@ -153,9 +155,10 @@ async def oauth_callback(
             status_code=400,
         )
 
-    # Exchange code for tokens.
+    # Exchange code for tokens. The token endpoint call is synchronous httpx,
+    # so run it in the threadpool rather than blocking the event loop.
     try:
-        token_response = exchange_code_for_tokens(code)
+        token_response = await to_thread.run_sync(exchange_code_for_tokens, code)
     except OAuthTokenExchangeError as e:
         logger.error("Token exchange failed: %s", e)
         redirect = RedirectResponse(
@@ -175,7 +178,7 @@ async def oauth_callback(
             "Publishing will be unavailable until reconnection."
         )
 
-    store_tokens(db, token_response, member_id=member_id)
+    await to_thread.run_sync(partial(store_tokens, db, token_response, member_id=member_id))
 
     logger.info("LinkedIn OAuth tokens stored successfully.")
 
@@ -15,6 +15,7 @@ from app.config import settings
 from app.database import get_session
 from app.ingest import DuplicateFileError, IngestError, ingest_file
 from app.models import Upload
+from app.routes.api import invalidate_metrics_cache
 
 # Chunk size for streaming reads (1 MiB)
 _CHUNK_SIZE = 1024 * 1024
@@ -115,6 +116,7 @@ async def handle_upload(
     try:
         upload, stats = ingest_file(db, dest_path, original_filename)
         ingest_succeeded = True
+        invalidate_metrics_cache()
         logger.info(
             "Import succeeded: %d records from '%s'",
             stats.total_records,
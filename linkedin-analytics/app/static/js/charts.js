@@ -347,10 +347,11 @@ async function initAnalytics(config) {
   // -------------------------------------------------------------------------
 
   const timeCtx = document.getElementById("engagementTimeChart");
-  if (timeCtx && posts.length > 0) {
-    const labels = posts.map((p) => p.post_date);
-    const erValues = posts.map((p) => parseFloat((p.engagement_rate * 100).toFixed(4)));
-    const rollingValues = posts.map((p) => parseFloat((p.rolling_avg_5 * 100).toFixed(4)));
+  // posts is columnar: one array per field, all the same length.
+  if (timeCtx && posts.post_date.length > 0) {
+    const labels = posts.post_date;
+    const erValues = posts.engagement_rate.map((v) => parseFloat((v * 100).toFixed(4)));
+    const rollingValues = posts.rolling_avg_5.map((v) => parseFloat((v * 100).toFixed(4)));
     const thresholdValues = labels.map(() => parseFloat((top_10pct_threshold * 100).toFixed(4)));
 
     new Chart(timeCtx, {
@@ -0,0 +1,39 @@
+"""Add indexes on the posts columns used by dashboard and analytics filters.
+
+Run once after deploying this change:
+    python scripts/migrate_003_post_indexes.py
+
+Idempotent: safe to run multiple times (uses CREATE INDEX IF NOT EXISTS).
+Index names match the ones SQLAlchemy generates for ``index=True`` columns,
+so databases created fresh via ``init_db()`` end up with the same schema.
+"""
+
+import sqlite3
+
+from app.config import settings
+
+
+def migrate() -> None:
+    conn = sqlite3.connect(str(settings.db_path))
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='posts'")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    columns = ["post_date", "topic", "content_format", "hook_style", "length_bucket"]
+
+    for col_name in columns:
+        index_name = f"ix_posts_{col_name}"
+        if index_name not in existing:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON posts ({col_name})")
+            print(f"Created index: {index_name}")
+        else:
+            print(f"Index already exists: {index_name}")
+
+    conn.commit()
+    conn.close()
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,30 @@
+"""Add a (category, snapshot_date) index to the demographic_snapshots table.
+
+Run once after deploying this change:
+    python scripts/migrate_004_demographic_index.py
+
+Idempotent: safe to run multiple times (uses CREATE INDEX IF NOT EXISTS).
+"""
+
+import sqlite3
+
+from app.config import settings
+
+
+def migrate() -> None:
+    conn = sqlite3.connect(str(settings.db_path))
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_demo_snapshot_category_date "
+        "ON demographic_snapshots (category, snapshot_date)"
+    )
+    print("Ensured index: ix_demo_snapshot_category_date")
+
+    conn.commit()
+    conn.close()
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
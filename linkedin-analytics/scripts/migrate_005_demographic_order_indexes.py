@@ -0,0 +1,44 @@
+"""Add indexes that return demographic rows already in display order.
+
+Run once after deploying this change:
+    python scripts/migrate_005_demographic_order_indexes.py
+
+Replaces ix_demo_snapshot_category_date (from migration 004) with
+ix_demo_snapshot_category_date_pct, which has the same leading columns plus
+percentage, and adds ix_post_demo_post_category_pct for per-post
+demographics.
+
+Idempotent: safe to run multiple times (uses IF [NOT] EXISTS).
+"""
+
+import sqlite3
+
+from app.config import settings
+
+
+def migrate() -> None:
+    conn = sqlite3.connect(str(settings.db_path))
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_demo_snapshot_category_date_pct "
+        "ON demographic_snapshots (category, snapshot_date, percentage)"
+    )
+    print("Ensured index: ix_demo_snapshot_category_date_pct")
+
+    cursor.execute("DROP INDEX IF EXISTS ix_demo_snapshot_category_date")
+    print("Dropped superseded index: ix_demo_snapshot_category_date")
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_post_demo_post_category_pct "
+        "ON post_demographics (post_id, category, percentage DESC)"
+    )
+    print("Ensured index: ix_post_demo_post_category_pct")
+
+    conn.commit()
+    conn.close()
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,35 @@
+"""Add a covering index for account-level daily metric reads.
+
+Run once after deploying this change:
+    python scripts/migrate_006_daily_metrics_covering_index.py
+
+Adds ix_daily_post_date_metrics on daily_metrics (post_id, metric_date and
+every metric column), so the summary and timeseries queries over
+account-level rows read the index alone.
+
+Idempotent: safe to run multiple times (uses IF NOT EXISTS).
+"""
+
+import sqlite3
+
+from app.config import settings
+
+
+def migrate() -> None:
+    conn = sqlite3.connect(str(settings.db_path))
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_daily_post_date_metrics "
+        "ON daily_metrics (post_id, metric_date, impressions, members_reached, "
+        "reactions, comments, shares, clicks)"
+    )
+    print("Ensured index: ix_daily_post_date_metrics")
+
+    conn.commit()
+    conn.close()
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    migrate()
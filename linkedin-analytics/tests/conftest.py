@@ -66,6 +66,15 @@ def test_session(test_engine):
         session.close()
 
 
+@pytest.fixture(autouse=True)
+def _clear_metrics_cache():
+    """Start each test with an empty aggregate cache (it outlives the per-test DB)."""
+    from app.routes.api import invalidate_metrics_cache
+
+    invalidate_metrics_cache()
+    yield
+
+
 # ---------------------------------------------------------------------------
 # FastAPI test client
 # ---------------------------------------------------------------------------
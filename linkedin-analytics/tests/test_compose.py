@@ -129,6 +129,29 @@ def test_list_drafts_filters_review_files(client, tmp_path, monkeypatch):
     assert "001-my-post.sensitivity-review.md" not in filenames
 
 
+def test_list_drafts_cached_until_dir_changes(client, tmp_path, monkeypatch):
+    """The listing is reused while the directory mtime is unchanged."""
+    import os
+    import time
+
+    from app.routes import api
+
+    drafts_dir = tmp_path / "drafts"
+    drafts_dir.mkdir()
+    (drafts_dir / "001-first.md").write_text("one")
+    old = time.time() - 60
+    os.utime(drafts_dir, (old, old))
+
+    monkeypatch.setattr("app.config.settings.drafts_dir", drafts_dir)
+    assert client.get("/api/drafts").json()["count"] == 1
+
+    with patch.object(api.os, "scandir", side_effect=AssertionError("rescanned")):
+        assert client.get("/api/drafts").json()["count"] == 1
+
+    (drafts_dir / "002-second.md").write_text("two")
+    assert client.get("/api/drafts").json()["count"] == 2
+
+
 def test_read_draft_success(client, tmp_path, monkeypatch):
     """GET /api/drafts/{filename} returns content with frontmatter stripped."""
     drafts_dir = tmp_path / "drafts"
@@ -153,6 +176,21 @@ def test_read_draft_success(client, tmp_path, monkeypatch):
     assert data["draft_id"] == "001"
 
 
+def test_read_draft_reflects_edits(client, tmp_path, monkeypatch):
+    """A cached draft is re-read once the file changes on disk."""
+    drafts_dir = tmp_path / "drafts"
+    drafts_dir.mkdir()
+    draft = drafts_dir / "003-edited.md"
+    draft.write_text("---\ntitle: x\n---\nFirst version")
+
+    monkeypatch.setattr("app.config.settings.drafts_dir", drafts_dir)
+    assert client.get("/api/drafts/003-edited.md").json()["content"] == "First version"
+    assert client.get("/api/drafts/003-edited.md").json()["content"] == "First version"
+
+    draft.write_text("---\ntitle: x\n---\nSecond, longer version")
+    assert client.get("/api/drafts/003-edited.md").json()["content"] == "Second, longer version"
+
+
 def test_read_draft_path_traversal_blocked(client, tmp_path, monkeypatch):
     """Path traversal attempts return 400."""
     drafts_dir = tmp_path / "drafts"
@@ -164,6 +202,20 @@ def test_read_draft_path_traversal_blocked(client, tmp_path, monkeypatch):
     assert resp.status_code in (400, 404)
 
 
+def test_read_draft_file_rejects_sibling_directory(tmp_path, monkeypatch):
+    """A sibling directory sharing the drafts prefix is outside the root."""
+    from app.routes.api import read_draft_file
+
+    drafts_dir = tmp_path / "drafts"
+    drafts_dir.mkdir()
+    sibling = tmp_path / "drafts-private"
+    sibling.mkdir()
+    (sibling / "secret.md").write_text("secret")
+
+    monkeypatch.setattr("app.config.settings.drafts_dir", drafts_dir)
+    assert read_draft_file("../drafts-private/secret.md") is None
+
+
 def test_read_draft_not_found(client, tmp_path, monkeypatch):
     """GET /api/drafts/nonexistent.md returns 404."""
     drafts_dir = tmp_path / "drafts"
@@ -190,6 +242,21 @@ def test_publish_text_too_long_returns_400(client):
     assert resp.status_code == 400
 
 
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]"])
+def test_publish_malformed_body_returns_400(client, body):
+    resp = client.post(
+        "/api/posts/publish",
+        content=body,
+        headers={"Content-Type": "application/json"},
+    )
+    assert resp.status_code == 400
+
+
+def test_publish_oversized_body_returns_413(client):
+    resp = client.post("/api/posts/publish", json={"text": "x" * (70 * 1024), "csrf_token": "x"})
+    assert resp.status_code == 413
+
+
 def test_publish_requires_oauth_connection(client):
     """Without tokens in DB, POST /api/posts/publish returns 403 (CSRF fails first)."""
     # CSRF check fires before auth check, so we get 403
@@ -325,6 +392,30 @@ def test_publish_missing_scope_returns_403(client, test_session, monkeypatch):
     assert "reconnect" in detail.lower() or "updated" in detail.lower()
 
 
+# ---------------------------------------------------------------------------
+# Server-side dedup window
+# ---------------------------------------------------------------------------
+
+
+def test_check_dedup_expires_and_caps_entries(monkeypatch):
+    from app.routes import api
+
+    monkeypatch.setattr(api, "_publish_dedup_order", api.deque())
+    monkeypatch.setattr(api, "_publish_dedup_keys", set())
+    clock = [1000.0]
+    monkeypatch.setattr(api.time, "monotonic", lambda: clock[0])
+
+    assert api._check_dedup(b"a") is False
+    assert api._check_dedup(b"a") is True
+    clock[0] += api._DEDUP_WINDOW_SECONDS + 1
+    assert api._check_dedup(b"a") is False
+
+    for i in range(api._DEDUP_MAX_ENTRIES):
+        api._check_dedup(f"k{i}".encode())
+    assert len(api._publish_dedup_keys) == api._DEDUP_MAX_ENTRIES
+    assert api._check_dedup(b"a") is False  # evicted as the oldest entry
+
+
 # ---------------------------------------------------------------------------
 # /api/posts/publish - full publish flow (mocked LinkedIn API)
 # ---------------------------------------------------------------------------
@@ -499,3 +590,88 @@ def test_publish_updates_existing_draft(client, test_session, monkeypatch):
     assert existing.status == "published"
     assert existing.content == "Published content for existing draft."
     assert existing.linkedin_post_id == "1111222233334444"
+
+
+def test_publish_unknown_post_id_skips_linkedin(client, test_session, monkeypatch):
+    """An unknown post_id returns 404 before anything is sent to LinkedIn."""
+    monkeypatch.setattr("app.config.settings.token_encryption_key", _TEST_KEY)
+    monkeypatch.setattr("app.routes.api.settings.token_encryption_key", _TEST_KEY)
+    _seed_oauth_token(test_session)
+    nonce = secrets.token_urlsafe(32)
+    csrf_token = _make_publish_csrf(nonce, _TEST_KEY)
+
+    with (
+        patch("app.oauth.get_valid_access_token", return_value="fake_access_token"),
+        patch("app.linkedin_client.create_post", new=AsyncMock()) as mock_create,
+        patch("app.routes.api._check_dedup", return_value=False),
+    ):
+        resp = client.post(
+            "/api/posts/publish",
+            json={"text": "Content for a missing post.", "post_id": 9999, "csrf_token": csrf_token},
+            cookies={"publish_nonce": nonce},
+        )
+
+    assert resp.status_code == 404
+    mock_create.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("sent", "expected"),
+    [(" connections ", "CONNECTIONS"), ("public", "PUBLIC"), ("FRIENDS", "PUBLIC"), (None, "PUBLIC")],
+)
+def test_publish_normalizes_visibility(client, test_session, monkeypatch, sent, expected):
+    """Visibility is case- and whitespace-insensitive; unknown values fall back to PUBLIC."""
+    monkeypatch.setattr("app.config.settings.token_encryption_key", _TEST_KEY)
+    monkeypatch.setattr("app.routes.api.settings.token_encryption_key", _TEST_KEY)
+    _seed_oauth_token(test_session)
+    nonce = secrets.token_urlsafe(32)
+    csrf_token = _make_publish_csrf(nonce, _TEST_KEY)
+
+    from app.linkedin_client import PublishResult
+    mock_result = PublishResult(
+        post_urn="urn:li:share:1212121212121212",
+        activity_id="1212121212121212",
+        post_url="https://www.linkedin.com/feed/update/urn:li:share:1212121212121212/",
+    )
+
+    with (
+        patch("app.oauth.get_valid_access_token", return_value="fake_access_token"),
+        patch("app.linkedin_client.create_post", new=AsyncMock(return_value=mock_result)) as mock_create,
+        patch("app.routes.api._check_dedup", return_value=False),
+    ):
+        resp = client.post(
+            "/api/posts/publish",
+            json={"text": "Visibility check.", "visibility": sent, "csrf_token": csrf_token},
+            cookies={"publish_nonce": nonce},
+        )
+
+    assert resp.status_code == 200, resp.text
+    assert mock_create.await_args.args[3] == expected
+
+
+def test_save_as_draft_keeps_engagement_rate(client, test_session):
+    """Editing text on a post with metrics leaves its engagement_rate intact."""
+    existing = Post(
+        post_date=date.today(),
+        title="Post with metrics",
+        content="Original",
+        status="published",
+        impressions=1000,
+        reactions=40,
+        comments=5,
+        shares=5,
+    )
+    existing.recalculate_engagement_rate()
+    test_session.add(existing)
+    test_session.commit()
+
+    resp = client.post(
+        "/api/posts/publish",
+        json={"text": "Edited text.", "post_id": existing.id, "save_as_draft": True},
+    )
+    assert resp.status_code == 200
+
+    new = client.post("/api/posts/publish", json={"text": "Fresh draft.", "save_as_draft": True})
+    test_session.expire_all()
+    assert test_session.get(Post, existing.id).engagement_rate == pytest.approx(0.05)
+    assert test_session.get(Post, new.json()["id"]).engagement_rate == 0.0
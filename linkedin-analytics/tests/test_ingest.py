@@ -383,3 +383,26 @@ class TestIngestFile:
         assert db_upload is not None
         assert db_upload.filename == "export.xlsx"
         assert db_upload.records_imported == stats.total_records
+
+    def test_invalid_file_rejected_before_dedup(self, test_session, tmp_path):
+        """An invalid upload fails validation before any Upload lookup."""
+        f = tmp_path / "empty.xlsx"
+        f.write_bytes(b"")
+        with pytest.raises(IngestError, match="empty"):
+            ingest_file(test_session, f, "empty.xlsx")
+        assert test_session.query(Upload).count() == 0
+
+    def test_duplicate_skips_workbook_load(self, test_session, sample_xlsx_path, tmp_path, monkeypatch):
+        """A known file_hash short-circuits before openpyxl touches the file."""
+        import shutil
+        from app import ingest
+        dest = tmp_path / "export.xlsx"
+        shutil.copy(sample_xlsx_path, dest)
+        ingest_file(test_session, dest, "export.xlsx")
+
+        def _fail_load(path):
+            raise AssertionError("workbook should not be loaded for a duplicate")
+
+        monkeypatch.setattr(ingest, "_load_workbook", _fail_load)
+        with pytest.raises(DuplicateFileError):
+            ingest_file(test_session, dest, "export.xlsx")
@@ -3,6 +3,7 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
+import orjson
 import pytest
 
 from app.linkedin_client import (
@@ -10,8 +11,13 @@ from app.linkedin_client import (
     LinkedInAPIError,
     LinkedInRateLimitError,
     PublishResult,
+    _breaker,
     _build_headers,
     _extract_activity_id,
+    _get_client,
+    _poll_delay,
+    aclose,
+    clear_header_cache,
     create_post,
     get_member_id,
 )
@@ -22,6 +28,15 @@ from app.linkedin_client import (
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture(autouse=True)
+def _reset_circuit_breaker():
+    """Each test starts with a closed breaker; failures must not leak across tests."""
+    _breaker.record_success()
+    yield
+    _breaker.record_success()
+
+
+
 def _make_response(
     status_code: int,
     headers: dict | None = None,
@@ -80,6 +95,31 @@ def test_build_headers(monkeypatch):
     assert headers["Content-Type"] == "application/json"
 
 
+def test_build_headers_memoized_per_token():
+    first = _build_headers("token_a")
+    assert _build_headers("token_a") is first
+    assert _build_headers("token_b") is not first
+    with pytest.raises(TypeError):
+        first["Authorization"] = "Bearer other"  # read-only view
+    clear_header_cache()
+    assert _build_headers("token_a") is not first
+
+
+# ---------------------------------------------------------------------------
+# Shared client
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_reused_until_closed():
+    client = _get_client()
+    assert _get_client() is client
+    await aclose()
+    assert client.is_closed
+    assert _get_client() is not client
+    await aclose()
+
+
 # ---------------------------------------------------------------------------
 # create_post
 # ---------------------------------------------------------------------------
@@ -113,11 +153,9 @@ async def test_create_post_success():
     )
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.post = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         result = await create_post(
             "test_token",
             "urn:li:person:abc123",
@@ -136,11 +174,9 @@ async def test_create_post_api_error_sanitized():
     mock_resp = _make_response(403)
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.post = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         with pytest.raises(LinkedInAPIError) as exc_info:
             await create_post("secret_token", "urn:li:person:abc", "Hello!")
 
@@ -157,11 +193,9 @@ async def test_create_post_rate_limited():
     )
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.post = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         with pytest.raises(LinkedInRateLimitError) as exc_info:
             await create_post("token", "urn:li:person:abc", "Hello!")
 
@@ -172,13 +206,11 @@ async def test_create_post_rate_limited():
 async def test_create_post_network_error_sanitized():
     """Mock httpx.ConnectError. Must raise LinkedInAPIError."""
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.post = AsyncMock(
         side_effect=httpx.ConnectError("Connection refused")
     )
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         with pytest.raises(LinkedInAPIError) as exc_info:
             await create_post("token", "urn:li:person:abc", "Hello!")
 
@@ -192,15 +224,161 @@ async def test_create_post_missing_restli_id():
     mock_resp = _make_response(201, headers={})
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.post = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         with pytest.raises(LinkedInAPIError, match="post ID"):
             await create_post("token", "urn:li:person:abc", "Hello!")
 
 
+@pytest.mark.asyncio
+async def test_create_post_falls_back_to_ugc_on_403():
+    """A 403 from /rest/posts retries once against /v2/ugcPosts with the UGC payload."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(side_effect=[
+        _make_response(403),
+        _make_response(201, headers={"x-restli-id": "urn:li:ugcPost:77"}),
+    ])
+
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
+        result = await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert result.activity_id == "77"
+    first, second = mock_client.post.await_args_list
+    assert first.args[0].endswith("/rest/posts")
+    assert "commentary" in orjson.loads(first.kwargs["content"])
+    assert second.args[0].endswith("/v2/ugcPosts")
+    assert "specificContent" in orjson.loads(second.kwargs["content"])
+
+
+def test_poll_delay_escalates_within_jitter():
+    assert 0.15 <= _poll_delay(0) <= 0.25
+    assert 1.5 <= _poll_delay(3) <= 2.5
+    # Past the end of the schedule, the last delay is reused
+    assert 3.75 <= _poll_delay(99) <= 6.25
+
+
+@pytest.mark.asyncio
+async def test_create_post_retries_429_then_succeeds():
+    """A 429 without a long Retry-After is retried after a backoff sleep."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(side_effect=[
+        _make_response(429),
+        _make_response(201, headers={"x-restli-id": "urn:li:share:42"}),
+    ])
+    sleep = AsyncMock()
+
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch("app.linkedin_client.asyncio.sleep", new=sleep),
+    ):
+        result = await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert result.activity_id == "42"
+    assert mock_client.post.await_count == 2
+    sleep.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_post_idempotency_key_stable_across_retries():
+    """Every attempt for one publish carries the same Idempotency-Key."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(side_effect=[
+        _make_response(503),
+        _make_response(201, headers={"x-restli-id": "urn:li:share:42"}),
+    ])
+
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch("app.linkedin_client.asyncio.sleep", new=AsyncMock()),
+    ):
+        await create_post("token", "urn:li:person:abc", "Hello!")
+
+    keys = {call.kwargs["headers"]["Idempotency-Key"] for call in mock_client.post.await_args_list}
+    assert len(keys) == 1
+    assert len(keys.pop()) == 32
+
+
+@pytest.mark.asyncio
+async def test_create_post_503_exhausts_retries():
+    """Persistent 503s stop after the attempt budget and raise LinkedInAPIError."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=_make_response(503))
+
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch("app.linkedin_client.asyncio.sleep", new=AsyncMock()),
+    ):
+        with pytest.raises(LinkedInAPIError, match="503"):
+            await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert mock_client.post.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_after_repeated_failures():
+    """After the failure threshold, create_post fails fast without calling LinkedIn."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=_make_response(503))
+
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch("app.linkedin_client.asyncio.sleep", new=AsyncMock()),
+    ):
+        for _ in range(_breaker.fail_threshold):
+            with pytest.raises(LinkedInAPIError, match="503"):
+                await create_post("token", "urn:li:person:abc", "Hello!")
+        calls_before = mock_client.post.await_count
+
+        with pytest.raises(LinkedInAPIError, match="temporarily unavailable"):
+            await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert mock_client.post.await_count == calls_before
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_half_open_success_closes():
+    """Once the cool-down passes, one successful call closes the breaker."""
+    for _ in range(_breaker.fail_threshold):
+        _breaker.record_failure()
+    assert _breaker.is_open
+
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(
+        return_value=_make_response(201, headers={"x-restli-id": "urn:li:share:1"})
+    )
+    opened_at = _breaker._opened_at
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch(
+            "app.linkedin_client.time.monotonic",
+            return_value=opened_at + _breaker.reset_timeout,
+        ),
+    ):
+        result = await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert result.activity_id == "1"
+    assert not _breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_create_post_client_error_not_retried():
+    """A 400 is never retried."""
+    mock_client = AsyncMock()
+    mock_client.post = AsyncMock(return_value=_make_response(400))
+    sleep = AsyncMock()
+
+    with (
+        patch("app.linkedin_client._get_client", return_value=mock_client),
+        patch("app.linkedin_client.asyncio.sleep", new=sleep),
+    ):
+        with pytest.raises(LinkedInAPIError):
+            await create_post("token", "urn:li:person:abc", "Hello!")
+
+    assert mock_client.post.await_count == 1
+    sleep.assert_not_awaited()
+
+
 # ---------------------------------------------------------------------------
 # get_member_id
 # ---------------------------------------------------------------------------
@@ -212,32 +390,45 @@ async def test_get_member_id_success():
     mock_resp = MagicMock(spec=httpx.Response)
     mock_resp.status_code = 200
     mock_resp.raise_for_status = MagicMock(return_value=None)
-    mock_resp.json.return_value = {
+    mock_resp.content = orjson.dumps({
         "sub": "abc123xyz",
         "name": "Ian Murphy",
         "email": "ian@example.com",
-    }
+    })
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.get = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         result = await get_member_id("test_token")
 
     assert result == "abc123xyz"
 
 
+@pytest.mark.asyncio
+async def test_get_member_id_escaped_sub_falls_back_to_full_decode():
+    """A 'sub' value with JSON escapes is decoded properly, not regex-captured."""
+    mock_resp = MagicMock(spec=httpx.Response)
+    mock_resp.status_code = 200
+    mock_resp.raise_for_status = MagicMock(return_value=None)
+    mock_resp.content = b'{"name": "Ian", "sub": "ab\\/c"}'
+
+    mock_client = AsyncMock()
+    mock_client.get = AsyncMock(return_value=mock_resp)
+
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
+        result = await get_member_id("test_token")
+
+    assert result == "ab/c"
+
+
 @pytest.mark.asyncio
 async def test_get_member_id_failure_returns_none():
     """Mock GET raising an error. Must return None (non-fatal)."""
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         result = await get_member_id("test_token")
 
     assert result is None
@@ -255,11 +446,9 @@ async def test_get_member_id_http_error_returns_none():
     )
 
     mock_client = AsyncMock()
-    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-    mock_client.__aexit__ = AsyncMock(return_value=None)
     mock_client.get = AsyncMock(return_value=mock_resp)
 
-    with patch("app.linkedin_client.httpx.AsyncClient", return_value=mock_client):
+    with patch("app.linkedin_client._get_client", return_value=mock_client):
         result = await get_member_id("test_token")
 
     assert result is None
@@ -3,9 +3,10 @@
 from datetime import date
 
 import pytest
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
-from app.models import DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, Upload
+from app.models import DailyMetric, DemographicSnapshot, FollowerSnapshot, OAuthToken, Post, Upload
 
 
 class TestPostModel:
@@ -100,6 +101,41 @@ class TestPostModel:
         post.impressions = None
         assert post.weighted_score == 0.0
 
+    def test_weighted_score_sql_expression_matches_python(self, test_session):
+        """Ordering by Post.weighted_score runs in SQL and matches the Python value."""
+        test_session.add_all([
+            Post(post_date=date(2025, 11, 1), impressions=1000, reactions=50, comments=10, shares=5),
+            Post(post_date=date(2025, 11, 2), impressions=100, reactions=10, comments=5, shares=None),
+            Post(post_date=date(2025, 11, 3), impressions=0, reactions=10),
+        ])
+        test_session.commit()
+
+        rows = (
+            test_session.query(Post, Post.weighted_score)
+            .order_by(Post.weighted_score.desc())
+            .all()
+        )
+        assert [post.post_date.day for post, _ in rows] == [2, 1, 3]
+        for post, score in rows:
+            assert score == pytest.approx(post.weighted_score, rel=1e-9)
+
+    def test_bulk_recalculate_engagement_rates(self, test_session):
+        """One UPDATE recomputes engagement_rate with the per-instance formula."""
+        posts = [
+            Post(post_date=date(2025, 11, 1), impressions=1000, reactions=50, comments=10, shares=5),
+            Post(post_date=date(2025, 11, 2), impressions=0, reactions=10),
+            Post(post_date=date(2025, 11, 3), impressions=200, reactions=20, comments=None),
+        ]
+        test_session.add_all(posts)
+        test_session.flush()
+
+        Post.bulk_recalculate_engagement_rates(test_session, [p.id for p in posts[:2]])
+
+        assert posts[0].engagement_rate == pytest.approx(0.065, rel=1e-6)
+        assert posts[1].engagement_rate == 0.0
+        # Not in post_ids: left at its default.
+        assert posts[2].engagement_rate == 0.0
+
     def test_cohort_fields_nullable(self, test_session):
         """All cohort columns accept null values (default state)."""
         post = Post(post_date=date(2025, 11, 1))
@@ -157,6 +193,19 @@ class TestDailyMetricModel:
         with pytest.raises(IntegrityError):
             test_session.commit()
 
+    def test_account_level_sum_reads_covering_index(self, test_session):
+        """The account-level per-day sum is answered from the covering index."""
+        plan = test_session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT metric_date, sum(clicks) FROM daily_metrics "
+                "WHERE post_id IS NULL AND metric_date >= '2025-01-01' "
+                "GROUP BY metric_date ORDER BY metric_date"
+            )
+        ).all()
+        details = " ".join(row[-1] for row in plan)
+        assert "COVERING INDEX ix_daily_post_date_metrics" in details
+        assert "TEMP B-TREE" not in details
+
     def test_account_level_metrics_allow_multiple_null_post_id(self, test_session):
         """SQLite treats NULL != NULL in UNIQUE constraints, so account-level
         (post_id=None) records on different dates are distinct rows."""
@@ -184,6 +233,25 @@ class TestDailyMetricModel:
         remaining = test_session.query(DailyMetric).filter_by(post_id=post.id).count()
         assert remaining == 0
 
+    def test_cascade_delete_does_not_load_children(self, test_session, sample_posts):
+        """Deleting a post relies on ON DELETE CASCADE instead of SELECTing its metrics."""
+        from sqlalchemy import event
+
+        post_id = sample_posts[0].id
+        test_session.add(DailyMetric(post_id=post_id, metric_date=date(2025, 11, 1)))
+        test_session.commit()
+        test_session.expunge_all()
+        post = test_session.get(Post, post_id)
+
+        statements = []
+        event.listen(test_session.bind, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        test_session.delete(post)
+        test_session.commit()
+
+        assert not any("FROM daily_metrics" in sql for sql in statements)
+        assert test_session.query(DailyMetric).filter_by(post_id=post_id).count() == 0
+
     def test_daily_metric_repr(self, test_session):
         metric = DailyMetric(post_id=None, metric_date=date(2025, 11, 1))
         test_session.add(metric)
@@ -316,3 +384,22 @@ class TestUploadModel:
         test_session.add(upload)
         test_session.commit()
         assert "Upload" in repr(upload)
+
+
+class TestOAuthTokenModel:
+    """Tests for the OAuthToken model."""
+
+    def test_has_scope_matches_whole_scope_names(self):
+        token = OAuthToken(scopes="openid profile w_member_social")
+        assert token.has_scope("w_member_social")
+        assert token.has_scope("openid")
+        assert not token.has_scope("member_social")
+
+    def test_has_scope_follows_updated_scopes(self):
+        token = OAuthToken(scopes="openid profile")
+        assert not token.has_scope("w_member_social")
+        token.scopes = "openid profile w_member_social"
+        assert token.has_scope("w_member_social")
+
+    def test_has_scope_empty(self):
+        assert not OAuthToken(scopes="").has_scope("openid")
@@ -2,7 +2,7 @@
 
 Tests cover:
 - Authorization URL construction
-- Fernet encrypt/decrypt round-trip and error handling
+- Token encrypt/decrypt round-trip, legacy Fernet reads and error handling
 - HMAC state signing and verification
 - CSRF token generation and verification for the disconnect form
 - Token storage (create and upsert)
@@ -33,6 +33,7 @@ from app.oauth import (
     decrypt_token,
     encrypt_token,
     generate_disconnect_csrf_token,
+    generate_publish_csrf_token,
     generate_state,
     get_auth_status,
     get_valid_access_token,
@@ -40,6 +41,7 @@ from app.oauth import (
     sign_state,
     store_tokens,
     verify_disconnect_csrf_token,
+    verify_publish_csrf_token,
     verify_state_signature,
 )
 
@@ -170,7 +172,7 @@ def test_build_authorization_url_uses_configured_redirect_uri(monkeypatch):
 
 
 # ---------------------------------------------------------------------------
-# 2. Fernet encrypt / decrypt
+# 2. Token encrypt / decrypt
 # ---------------------------------------------------------------------------
 
 
@@ -188,6 +190,39 @@ def test_encrypt_returns_string():
     assert isinstance(result, str)
 
 
+def test_decrypt_legacy_fernet_token():
+    """Tokens written with Fernet before the AES-GCM switch must still decrypt."""
+    legacy = Fernet(_TEST_FERNET_KEY.encode()).encrypt(b"old_token").decode()
+    assert not encrypt_token("old_token").startswith("gAAAA")
+    assert decrypt_token(legacy) == "old_token"
+
+
+def test_decrypt_aesgcm_with_wrong_key_returns_none(monkeypatch):
+    """An AES-GCM ciphertext decrypted under another key must return None."""
+    from app import oauth as oauth_module
+
+    enc = encrypt_token("secret_token")
+
+    mock_settings = MagicMock()
+    mock_settings.token_encryption_key = _ANOTHER_FERNET_KEY
+    monkeypatch.setattr(oauth_module, "settings", mock_settings)
+
+    assert decrypt_token(enc) is None
+
+
+def test_fernet_instance_reused_per_key(monkeypatch):
+    """The Fernet instance is built once per key and rebuilt when the key changes."""
+    from app import oauth as oauth_module
+
+    first = oauth_module._get_fernet()
+    assert oauth_module._get_fernet() is first
+
+    mock_settings = MagicMock()
+    mock_settings.token_encryption_key = _ANOTHER_FERNET_KEY
+    monkeypatch.setattr(oauth_module, "settings", mock_settings)
+    assert oauth_module._get_fernet() is not first
+
+
 def test_fernet_key_validated_at_startup():
     """A malformed TOKEN_ENCRYPTION_KEY must cause Settings instantiation to fail."""
     from pydantic import ValidationError
@@ -257,6 +292,17 @@ def test_different_state_same_signature_rejected():
     assert verify_state_signature(other_state, sig) is False
 
 
+def test_signatures_match_plain_hmac_sha256():
+    """Cached HMAC templates must produce the same digests as a fresh hmac.new."""
+    key = _TEST_FERNET_KEY.encode()
+    assert sign_state("abc") == hmac.new(key, b"abc", hashlib.sha256).hexdigest()
+    assert generate_disconnect_csrf_token("n1") == hmac.new(
+        key, b"disconnect:n1", hashlib.sha256
+    ).hexdigest()
+    # Repeated calls reuse the template without carrying state between them.
+    assert sign_state("abc") == sign_state("abc")
+
+
 # ---------------------------------------------------------------------------
 # 4. CSRF token for disconnect form
 # ---------------------------------------------------------------------------
@@ -283,6 +329,17 @@ def test_wrong_nonce_csrf_rejected():
     assert verify_disconnect_csrf_token("nonce_b", token) is False
 
 
+def test_publish_csrf_token_not_interchangeable_with_disconnect():
+    """Publish and disconnect tokens for the same nonce must differ."""
+    nonce = "shared_nonce"
+    publish_token = generate_publish_csrf_token(nonce)
+    assert verify_publish_csrf_token(nonce, publish_token) is True
+    assert verify_disconnect_csrf_token(nonce, publish_token) is False
+    assert publish_token == hmac.new(
+        _TEST_FERNET_KEY.encode(), b"publish:" + nonce.encode(), hashlib.sha256
+    ).hexdigest()
+
+
 # ---------------------------------------------------------------------------
 # 5. store_tokens
 # ---------------------------------------------------------------------------
@@ -314,6 +371,15 @@ def test_store_tokens_upserts_on_reauth(db_session):
     assert decrypt_token(rows[0].access_token_encrypted) == "second_token"
 
 
+def test_store_tokens_refresh_keeps_member_id(db_session):
+    """Re-storing without a member_id (token refresh) must keep the stored one."""
+    store_tokens(db_session, _make_token_response(), member_id="urn:li:person:abc123")
+    row = store_tokens(db_session, _make_token_response(access_token="refreshed"))
+
+    assert row.linkedin_member_id == "urn:li:person:abc123"
+    assert decrypt_token(row.access_token_encrypted) == "refreshed"
+
+
 def test_store_tokens_access_expiry_set(db_session):
     """store_tokens must set access_token_expires_at from expires_in."""
     tr = _make_token_response(expires_in=3600)
@@ -328,6 +394,52 @@ def test_store_tokens_access_expiry_set(db_session):
     assert before + timedelta(seconds=3590) <= expires_at <= after + timedelta(seconds=3610)
 
 
+def test_get_token_row_uses_identity_map_when_loaded(db_session):
+    """Once the row is in the session, get_token_row issues no SQL."""
+    from app.oauth import get_token_row
+
+    store_tokens(db_session, _make_token_response())
+    stored = get_token_row(db_session)
+    statements = []
+    event.listen(db_session.bind, "before_cursor_execute",
+                 lambda *args: statements.append(args[2]))
+
+    assert get_token_row(db_session) is stored
+    assert statements == []
+
+
+def test_status_check_does_not_load_refresh_token(db_session):
+    """get_auth_status must not read the refresh-token ciphertext."""
+    from sqlalchemy import inspect
+
+    store_tokens(db_session, _make_token_response())
+    db_session.expunge_all()
+
+    assert get_auth_status(db_session).connected is True
+    row = db_session.query(OAuthToken).one()
+    assert "refresh_token_encrypted" in inspect(row).unloaded
+
+
+def test_get_token_row_after_revoke_and_reconnect(db_session):
+    """A stale cached id falls back to the provider lookup."""
+    from app.oauth import get_token_row
+
+    store_tokens(db_session, _make_token_response(access_token="first"))
+    revoke_tokens(db_session)
+    assert get_token_row(db_session) is None
+
+    db_session.add(OAuthToken(
+        provider="linkedin",
+        access_token_encrypted=encrypt_token("second"),
+        refresh_token_encrypted=encrypt_token("refresh"),
+        access_token_expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+        refresh_token_expires_at=datetime.now(timezone.utc) + timedelta(days=300),
+        scopes="openid profile",
+    ))
+    db_session.commit()
+    assert decrypt_token(get_token_row(db_session).access_token_encrypted) == "second"
+
+
 # ---------------------------------------------------------------------------
 # 6. get_auth_status
 # ---------------------------------------------------------------------------
@@ -416,6 +528,29 @@ def test_get_valid_access_token_expired_refresh_succeeds(db_session):
     assert result == "refreshed_access_token"
 
 
+def test_refresh_with_unchanged_refresh_token_keeps_ciphertext(db_session):
+    """An unchanged refresh token is not re-encrypted and keeps its stored expiry."""
+    row = _store_expired_tokens(db_session, access_expired=True, refresh_expired=False)
+    old_ciphertext = row.refresh_token_encrypted
+    old_expiry = row.refresh_token_expires_at
+
+    new_tr = _make_token_response(
+        access_token="refreshed_access_token",
+        refresh_token="live_refresh_token",
+    )
+
+    with patch("app.oauth.refresh_access_token", return_value=new_tr), \
+            patch("app.oauth.encrypt_token", wraps=encrypt_token) as mock_encrypt:
+        assert get_valid_access_token(db_session) == "refreshed_access_token"
+
+    mock_encrypt.assert_called_once_with("refreshed_access_token")
+    db_session.expire_all()
+    row = db_session.query(OAuthToken).one()
+    assert row.refresh_token_encrypted == old_ciphertext
+    assert row.refresh_token_expires_at == old_expiry
+    assert decrypt_token(row.access_token_encrypted) == "refreshed_access_token"
+
+
 def test_get_valid_access_token_refresh_token_expired(db_session):
     """With both tokens expired, return None and do not attempt refresh."""
     _store_expired_tokens(db_session, access_expired=True, refresh_expired=True)
@@ -437,6 +572,59 @@ def test_get_valid_access_token_refresh_call_fails(db_session):
     assert result is None
 
 
+def test_get_valid_access_token_skips_refresh_done_while_waiting(db_session, monkeypatch):
+    """If another thread stores fresh tokens while we wait for the lock, reuse them."""
+    import contextlib
+    from app import oauth as oauth_module
+
+    _store_expired_tokens(db_session, access_expired=True, refresh_expired=False)
+
+    @contextlib.contextmanager
+    def _lock_acquired_after_other_refresh():
+        # Simulates the thread that held the lock finishing its refresh.
+        store_tokens(db_session, _make_token_response(access_token="other_thread_token"))
+        yield
+
+    monkeypatch.setattr(oauth_module, "_refresh_lock", _lock_acquired_after_other_refresh())
+
+    with patch("app.oauth.refresh_access_token") as mock_refresh:
+        result = get_valid_access_token(db_session)
+
+    mock_refresh.assert_not_called()
+    assert result == "other_thread_token"
+
+
+def test_get_valid_access_token_revoked_while_waiting(db_session, monkeypatch):
+    """A disconnect while we wait for the lock must not be undone by a refresh."""
+    from app import oauth as oauth_module
+
+    _store_expired_tokens(db_session, access_expired=True, refresh_expired=False)
+    other_session = sessionmaker(bind=db_session.get_bind())()
+
+    class _LockAcquiredAfterRevoke:
+        # Simulates a disconnect from another request holding the lock first;
+        # revoke_tokens takes the lock itself, so only the first entry revokes.
+        pending = True
+
+        def __enter__(self):
+            if self.pending:
+                self.pending = False
+                revoke_tokens(other_session)
+
+        def __exit__(self, *exc_info):
+            return False
+
+    monkeypatch.setattr(oauth_module, "_refresh_lock", _LockAcquiredAfterRevoke())
+
+    with patch("app.oauth.refresh_access_token") as mock_refresh:
+        result = get_valid_access_token(db_session)
+
+    other_session.close()
+    mock_refresh.assert_not_called()
+    assert result is None
+    assert db_session.query(OAuthToken).count() == 0
+
+
 # ---------------------------------------------------------------------------
 # 8. revoke_tokens
 # ---------------------------------------------------------------------------
@@ -479,11 +667,9 @@ def test_exchange_code_sanitizes_http_status_error(monkeypatch):
     from app.oauth import exchange_code_for_tokens
 
     def mock_post(*args, **kwargs):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 401
-        raise httpx.HTTPStatusError("Unauthorized", request=MagicMock(), response=mock_resp)
+        return httpx.Response(401, json={"error": "invalid_client"})
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr("app.oauth._get_token_client", lambda: MagicMock(post=mock_post))
 
     with pytest.raises(OAuthTokenExchangeError) as exc_info:
         exchange_code_for_tokens("bad_code")
@@ -494,6 +680,34 @@ def test_exchange_code_sanitizes_http_status_error(monkeypatch):
     assert "client_secret" not in error_msg
 
 
+def test_refresh_access_token_parses_response(monkeypatch):
+    """A 200 token response is parsed into a TokenResponse with defaults filled in."""
+    import httpx
+    from app.oauth import refresh_access_token
+
+    def mock_post(*args, **kwargs):
+        return httpx.Response(200, json={"access_token": "new_access", "expires_in": 3600})
+
+    monkeypatch.setattr("app.oauth._get_token_client", lambda: MagicMock(post=mock_post))
+
+    result = refresh_access_token("refresh_value")
+    assert result.access_token == "new_access"
+    assert result.expires_in == 3600
+    assert result.refresh_token == "refresh_value"
+
+
+def test_token_client_is_reused_until_closed():
+    """Token calls share one pooled client; close_http_client() discards it."""
+    from app.oauth import _get_token_client, close_http_client
+
+    client = _get_token_client()
+    assert _get_token_client() is client
+    close_http_client()
+    assert client.is_closed
+    assert _get_token_client() is not client
+    close_http_client()
+
+
 def test_exchange_code_sanitizes_network_error(monkeypatch):
     """exchange_code_for_tokens must raise OAuthTokenExchangeError on network errors."""
     import httpx
@@ -502,7 +716,7 @@ def test_exchange_code_sanitizes_network_error(monkeypatch):
     def mock_post(*args, **kwargs):
         raise httpx.ConnectError("Connection refused")
 
-    monkeypatch.setattr(httpx, "post", mock_post)
+    monkeypatch.setattr("app.oauth._get_token_client", lambda: MagicMock(post=mock_post))
 
     with pytest.raises(OAuthTokenExchangeError) as exc_info:
         exchange_code_for_tokens("code")
@@ -419,3 +419,21 @@ def test_upload_still_works_with_oauth(client, oauth_settings_patch, sample_xlsx
     )
     # Accept redirect or 200 (upload succeeded or was processed)
     assert response.status_code in (200, 302, 303)
+
+
+def test_static_and_api_skip_oauth_status_lookup(client, monkeypatch):
+    """Static files and JSON API calls must not query the OAuth token table."""
+    from app import main as main_module
+
+    monkeypatch.setattr(main_module.settings, "linkedin_client_id", "id")
+    monkeypatch.setattr(main_module.settings, "linkedin_client_secret", "secret")
+    monkeypatch.setattr(main_module.settings, "token_encryption_key", _TEST_FERNET_KEY)
+    lookup = MagicMock(return_value=False)
+    monkeypatch.setattr(main_module, "_load_oauth_connected", lookup)
+
+    assert client.get("/static/css/style.css").status_code == 200
+    assert client.get("/api/metrics/summary").status_code == 200
+    lookup.assert_not_called()
+
+    assert client.get("/dashboard").status_code == 200
+    lookup.assert_called_once()
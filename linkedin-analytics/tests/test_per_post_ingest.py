@@ -1,5 +1,6 @@
 """Tests for per-post XLSX import functionality."""
 
+import hashlib
 from datetime import date
 from io import BytesIO
 
@@ -7,6 +8,7 @@ import openpyxl
 import pytest
 
 from app.ingest import (
+    _detect_file_format,
     _detect_xlsx_format,
     _extract_urn_from_url,
     _parse_int_with_commas,
@@ -15,7 +17,7 @@ from app.ingest import (
     _parse_post_hour,
     ingest_per_post_xlsx,
 )
-from app.models import Post, PostDemographic
+from app.models import Post, PostDemographic, Upload
 
 
 # ---------------------------------------------------------------------------
@@ -110,6 +112,16 @@ def test_detect_unknown_format():
     assert _detect_xlsx_format(wb) == "unknown"
 
 
+def test_detect_file_format_from_saved_files(tmp_path):
+    """Saved workbooks are classified from their sheet names alone."""
+    per_post = tmp_path / "per_post.xlsx"
+    _build_per_post_workbook().save(per_post)
+    aggregate = tmp_path / "aggregate.xlsx"
+    _build_aggregate_workbook().save(aggregate)
+    assert _detect_file_format(per_post) == "per_post"
+    assert _detect_file_format(aggregate) == "aggregate"
+
+
 # ---------------------------------------------------------------------------
 # Performance sheet parsing
 # ---------------------------------------------------------------------------
@@ -438,3 +450,39 @@ def test_batch_upload_endpoint(client, tmp_path):
     assert data["total"] == 1
     assert data["succeeded"] == 1
     assert data["results"][0]["status"] == "ok"
+
+
+def test_batch_upload_reports_repeat_within_batch_as_duplicate(client, test_session):
+    """The same file twice in one batch is imported once, then reported as a duplicate."""
+    from io import BytesIO
+    wb = _build_per_post_workbook(
+        post_url="https://www.linkedin.com/feed/update/urn:li:share:6655443322110099",
+    )
+    buf = BytesIO()
+    wb.save(buf)
+    content = buf.getvalue()
+    xlsx_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    resp = client.post(
+        "/api/upload/batch",
+        files=[
+            ("files", ("first.xlsx", BytesIO(content), xlsx_type)),
+            ("files", ("empty.xlsx", BytesIO(b""), xlsx_type)),
+            ("files", ("second.xlsx", BytesIO(content), xlsx_type)),
+        ],
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [r["status"] for r in data["results"]] == ["ok", "error", "duplicate"]
+    assert [r["filename"] for r in data["results"]] == ["first.xlsx", "empty.xlsx", "second.xlsx"]
+    assert data["succeeded"] == 1
+    assert test_session.query(Upload).count() == 1
+    # Hashed while streaming, but identical to hashing the saved file.
+    assert test_session.query(Upload).one().file_hash == hashlib.sha256(content).hexdigest()
+
+    # A later batch with the same file is caught by the database lookup.
+    resp = client.post(
+        "/api/upload/batch",
+        files=[("files", ("again.xlsx", BytesIO(content), xlsx_type))],
+    )
+    assert resp.json()["results"][0]["status"] == "duplicate"
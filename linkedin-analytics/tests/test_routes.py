@@ -1,7 +1,9 @@
 """Tests for API and dashboard page routes."""
 
 import io
+import math
 import shutil
+import statistics
 from datetime import date, timedelta
 from pathlib import Path
 
@@ -11,7 +13,7 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.database import get_session
-from app.models import Base, DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, Upload
+from app.models import Base, DailyMetric, DemographicSnapshot, FollowerSnapshot, Post, PostDemographic, Upload
 
 
 # ---------------------------------------------------------------------------
@@ -295,6 +297,48 @@ class TestMetricsSummary:
         assert data["total_impressions"] > 0
         assert data["total_followers"] > 0
 
+    def test_summary_is_one_select(self, seeded_client, _shared_engine):
+        c, db = seeded_client
+        _seed_db(db)
+
+        statements = []
+        event.listen(_shared_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        data = c.get("/api/metrics/summary?days=30").json()
+
+        assert len(statements) == 1
+        assert data["total_impressions"] == sum(200 + i * 10 for i in range(30))
+        assert data["total_followers"] == 450 + sum(i % 5 + 1 for i in range(30))
+        assert data["new_followers_period"] == sum(i % 5 + 1 for i in range(30))
+        assert data["total_posts_tracked"] == 5
+
+
+    def test_summary_sets_etag_and_honours_if_none_match(self, client):
+        first = client.get("/api/metrics/summary")
+        etag = first.headers["etag"]
+
+        repeat = client.get("/api/metrics/summary", headers={"If-None-Match": etag})
+        assert repeat.status_code == 304
+        assert repeat.content == b""
+        assert repeat.headers["etag"] == etag
+
+        other = client.get("/api/metrics/summary?days=7", headers={"If-None-Match": etag})
+        assert other.status_code == 200
+        assert other.headers["etag"] != etag
+
+
+    def test_summary_cached_until_invalidated(self, seeded_client):
+        from app.routes.api import invalidate_metrics_cache
+
+        c, db = seeded_client
+        assert c.get("/api/metrics/summary").json()["total_posts_tracked"] == 0
+
+        _seed_db(db)
+        assert c.get("/api/metrics/summary").json()["total_posts_tracked"] == 0
+
+        invalidate_metrics_cache()
+        assert c.get("/api/metrics/summary").json()["total_posts_tracked"] == 5
+
 
 # ---------------------------------------------------------------------------
 # API: metrics/timeseries
@@ -345,6 +389,47 @@ class TestPostsApi:
         assert data["total"] == 5
         assert len(data["posts"]) == 5
 
+    def test_list_posts_total_counts_all_pages(self, seeded_client):
+        c, db = seeded_client
+        _seed_db(db)
+        page = c.get("/api/posts?limit=2&offset=2").json()
+        assert page["total"] == 5
+        assert len(page["posts"]) == 2
+        assert c.get("/api/posts?offset=10").json()["total"] == 5
+
+    @pytest.mark.parametrize("sort,order", [("post_date", "desc"), ("shares", "asc"), ("engagement_rate", "desc")])
+    def test_list_posts_cursor_walk_matches_offset(self, seeded_client, sort, order):
+        c, db = seeded_client
+        _seed_db(db)
+        # Ties on the sort value and a NULL metric must not skip or repeat rows.
+        db.add(Post(post_date=date.today(), shares=None, engagement_rate=None))
+        db.add(Post(post_date=date.today(), shares=5, engagement_rate=0.0))
+        db.commit()
+
+        expected = [p["id"] for p in c.get(f"/api/posts?sort={sort}&order={order}&limit=100").json()["posts"]]
+        url = f"/api/posts?sort={sort}&order={order}&limit=2"
+        page = c.get(url).json()
+        seen = [p["id"] for p in page["posts"]]
+        while page["next_cursor"]:
+            page = c.get(f"{url}&after={page['next_cursor']}").json()
+            assert page["total"] is None
+            seen.extend(p["id"] for p in page["posts"])
+        assert seen == expected
+
+    def test_list_posts_cursor_total_on_request(self, seeded_client):
+        c, db = seeded_client
+        _seed_db(db)
+        cursor = c.get("/api/posts?limit=2").json()["next_cursor"]
+        assert c.get(f"/api/posts?limit=2&after={cursor}").json()["total"] is None
+        assert c.get(f"/api/posts?limit=2&after={cursor}&include_total=true").json()["total"] == 5
+
+    def test_list_posts_invalid_cursor_rejected(self, seeded_client):
+        c, db = seeded_client
+        _seed_db(db)
+        assert c.get("/api/posts?after=not-a-cursor").status_code == 400
+        date_cursor = c.get("/api/posts?limit=1").json()["next_cursor"]
+        assert c.get(f"/api/posts?sort=impressions&after={date_cursor}").status_code == 400
+
     def test_list_posts_sorting(self, seeded_client):
         c, db = seeded_client
         _seed_db(db)
@@ -354,6 +439,18 @@ class TestPostsApi:
         impressions = [p["impressions"] for p in data["posts"]]
         assert impressions == sorted(impressions, reverse=True)
 
+    def test_list_posts_content_preview(self, seeded_client):
+        c, db = seeded_client
+        for content in ("x" * 200, "y" * 201, None):
+            db.add(Post(post_date=date.today(), content=content))
+        db.commit()
+
+        previews = [p["content"] for p in c.get("/api/posts?sort=impressions").json()["posts"]]
+        assert sorted(previews, key=str) == sorted(["x" * 200, "y" * 200 + "...", None], key=str)
+
+        post = db.query(Post).filter(Post.content.is_not(None)).first()
+        assert c.get(f"/api/posts/{post.id}").json()["content"] == post.content
+
     def test_get_single_post_not_found(self, client):
         resp = client.get("/api/posts/99999")
         assert resp.status_code == 404
@@ -368,6 +465,22 @@ class TestPostsApi:
         assert data["id"] == post.id
         assert "daily_metrics" in data
 
+    def test_get_single_post_children_ordered(self, seeded_client):
+        c, db = seeded_client
+        post = Post(post_date=date.today())
+        db.add(post)
+        db.flush()
+        for day in (3, 1, 2):
+            db.add(DailyMetric(post_id=post.id, metric_date=date(2025, 1, day), impressions=day))
+        for category, value, pct in [("seniority", "Senior", 0.2), ("industry", "IT", 0.1), ("industry", "Finance", 0.4)]:
+            db.add(PostDemographic(post_id=post.id, category=category, value=value, percentage=pct))
+        db.commit()
+
+        data = c.get(f"/api/posts/{post.id}").json()
+        assert [m["impressions"] for m in data["daily_metrics"]] == [1, 2, 3]
+        assert [d["value"] for d in data["demographics"]] == ["Finance", "IT", "Senior"]
+        assert c.get(f"/dashboard/posts/{post.id}").status_code == 200
+
     def test_invalid_sort_field_rejected(self, client):
         resp = client.get("/api/posts?sort=password")
         assert resp.status_code == 422
@@ -471,6 +584,12 @@ def _seed_cohort_posts(db: Session) -> list[Post]:
 # ---------------------------------------------------------------------------
 
 
+def _post_rows(engagement: dict) -> list[dict]:
+    """Turn the engagement endpoint's columnar posts back into one dict per post."""
+    columns = engagement["posts"]
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
 class TestAnalyticsEngagementApi:
     def test_engagement_empty_db(self, client):
         """Returns valid structure with empty data."""
@@ -482,7 +601,7 @@ class TestAnalyticsEngagementApi:
         assert "top_10pct_threshold" in data
         assert "baseline" in data
         assert "last_30d" in data
-        assert data["posts"] == []
+        assert _post_rows(data) == []
         assert data["monthly_medians"] == []
         assert data["top_10pct_threshold"] == 0.0
 
@@ -493,17 +612,14 @@ class TestAnalyticsEngagementApi:
         resp = c.get("/api/analytics/engagement?days=365")
         assert resp.status_code == 200
         data = resp.json()
-        assert len(data["posts"]) == 5
+        assert len(_post_rows(data)) == 5
         assert len(data["monthly_medians"]) >= 1
         assert data["top_10pct_threshold"] > 0.0
         assert data["baseline"]["post_count"] == 5
-        # Each post object has required fields
-        post = data["posts"][0]
-        assert "id" in post
-        assert "post_date" in post
-        assert "engagement_rate" in post
-        assert "weighted_score" in post
-        assert "rolling_avg_5" in post
+        # Posts are columnar: one equal-length array per field
+        columns = data["posts"]
+        for field in ("id", "post_date", "engagement_rate", "weighted_score", "rolling_avg_5"):
+            assert len(columns[field]) == 5
 
     def test_engagement_rolling_avg(self, seeded_client):
         """Rolling average is computed for a window of 5 posts."""
@@ -512,13 +628,44 @@ class TestAnalyticsEngagementApi:
         resp = c.get("/api/analytics/engagement?days=365")
         assert resp.status_code == 200
         data = resp.json()
-        posts = data["posts"]
+        posts = _post_rows(data)
         assert len(posts) == 6
         # The last post's rolling_avg_5 should differ from its own engagement_rate
         # (it averages over the 5-post window)
         last = posts[-1]
         assert last["rolling_avg_5"] != last["engagement_rate"] or len(posts) == 1
 
+    def test_engagement_rolling_avg_matches_window_mean(self, seeded_client):
+        """Each rolling_avg_5 equals the mean of the last (up to) 5 engagement rates."""
+        c, db = seeded_client
+        _seed_cohort_posts(db)
+        posts = _post_rows(c.get("/api/analytics/engagement?days=365").json())
+        rates = [p["engagement_rate"] for p in posts]
+        for i, post in enumerate(posts):
+            window = rates[max(0, i - 4) : i + 1]
+            assert post["rolling_avg_5"] == pytest.approx(sum(window) / len(window), abs=1e-5)
+
+    def test_engagement_threshold_is_90th_percentile(self, seeded_client):
+        c, db = seeded_client
+        _seed_cohort_posts(db)
+        data = c.get("/api/analytics/engagement?days=365").json()
+        rates = sorted(p["engagement_rate"] for p in _post_rows(data))
+        assert data["top_10pct_threshold"] == rates[math.ceil(len(rates) * 0.9) - 1]
+
+    def test_engagement_baseline_and_last_30d_averages(self, seeded_client):
+        c, db = seeded_client
+        _seed_cohort_posts(db)
+        data = c.get("/api/analytics/engagement?days=365").json()
+        cutoff = str(date.today() - timedelta(days=30))
+        for key, posts in (
+            ("baseline", _post_rows(data)),
+            ("last_30d", [p for p in _post_rows(data) if p["post_date"] >= cutoff]),
+        ):
+            assert data[key]["post_count"] == len(posts)
+            for field in ("engagement_rate", "weighted_score"):
+                expected = sum(p[field] for p in posts) / len(posts) if posts else 0.0
+                assert data[key][f"avg_{field}"] == pytest.approx(expected, abs=1e-5)
+
     def test_engagement_rolling_avg_few_posts(self, seeded_client):
         """Rolling average handles fewer than 5 posts gracefully."""
         c, db = seeded_client
@@ -538,9 +685,9 @@ class TestAnalyticsEngagementApi:
         resp = c.get("/api/analytics/engagement?days=365")
         assert resp.status_code == 200
         data = resp.json()
-        assert len(data["posts"]) == 2
+        assert len(_post_rows(data)) == 2
         # First post: rolling avg equals its own rate
-        first = data["posts"][0]
+        first = _post_rows(data)[0]
         assert first["rolling_avg_5"] == pytest.approx(first["engagement_rate"], rel=1e-4)
 
     def test_engagement_weighted_score(self, seeded_client):
@@ -559,7 +706,7 @@ class TestAnalyticsEngagementApi:
         resp = c.get("/api/analytics/engagement?days=365")
         assert resp.status_code == 200
         data = resp.json()
-        p = data["posts"][0]
+        p = _post_rows(data)[0]
         # ((1*50) + (3*10) + (4*5)) / 1000 = 100 / 1000 = 0.1
         assert p["weighted_score"] == pytest.approx(0.1, rel=1e-4)
 
@@ -571,7 +718,7 @@ class TestAnalyticsEngagementApi:
         assert resp.status_code == 200
         data = resp.json()
         threshold = data["top_10pct_threshold"]
-        rates = [p["engagement_rate"] for p in data["posts"]]
+        rates = [p["engagement_rate"] for p in _post_rows(data)]
         assert threshold >= 0.0
         # Threshold should be >= the median engagement rate
         assert threshold >= sorted(rates)[len(rates) // 2]
@@ -661,6 +808,42 @@ class TestAnalyticsCohortApi:
         assert "story" in formats
         assert "tutorial" in formats
 
+    def test_cohort_stats_match_python_aggregates(self, seeded_client):
+        """SQL aggregates agree with mean/median/max over the cohort's posts."""
+        c, db = seeded_client
+        base = date.today() - timedelta(days=30)
+        # post_hour 9 has an even count and a tie for the best engagement rate.
+        for day, hour, reactions in [(0, 9, 40), (1, 9, 10), (2, 9, 40), (3, 9, 20), (4, 10, 30)]:
+            post = Post(
+                post_date=base + timedelta(days=day),
+                impressions=1000,
+                reactions=reactions,
+                comments=2,
+                shares=1,
+                post_hour=hour,
+            )
+            post.recalculate_engagement_rate()
+            db.add(post)
+        db.add(Post(post_date=base, impressions=0, engagement_rate=None, post_hour=10))
+        db.commit()
+
+        cohorts = c.get("/api/analytics/cohorts?dimension=post_hour").json()["cohorts"]
+        assert [ch["value"] for ch in cohorts] == ["10", "9"]
+        for cohort in cohorts:
+            posts = (
+                db.query(Post)
+                .filter(Post.post_hour == int(cohort["value"]))
+                .order_by(Post.post_date, Post.id)
+                .all()
+            )
+            rates = [p.engagement_rate or 0.0 for p in posts]
+            scores = [p.weighted_score for p in posts]
+            assert cohort["post_count"] == len(posts)
+            assert cohort["avg_engagement_rate"] == round(sum(rates) / len(rates), 6)
+            assert cohort["avg_weighted_score"] == round(sum(scores) / len(scores), 6)
+            assert cohort["median_engagement_rate"] == round(statistics.median(rates), 6)
+            assert cohort["best_post_id"] == posts[rates.index(max(rates))].id
+
 
 # ---------------------------------------------------------------------------
 # API: PATCH /api/posts/{id} cohort fields
@@ -722,6 +905,61 @@ class TestPostUpdateCohortFields:
         data = resp.json()
         assert data["topic"] == "risk-management"
 
+    def test_metric_update_recalculates_engagement_rate(self, seeded_client):
+        """PATCH with new metrics recomputes engagement_rate."""
+        c, db = seeded_client
+        _seed_db(db)
+        post = db.query(Post).first()
+        resp = c.patch(
+            f"/api/posts/{post.id}?impressions=1000&reactions=30&comments=10&shares=10"
+        )
+        assert resp.status_code == 200
+        assert resp.json()["engagement_rate"] == pytest.approx(0.05)
+
+    def test_noop_update_does_not_commit(self, seeded_client, monkeypatch):
+        """PATCH that changes nothing skips the commit."""
+        c, db = seeded_client
+        _seed_db(db)
+        post = db.query(Post).first()
+        c.patch(f"/api/posts/{post.id}?topic=risk-management")
+
+        commits = []
+        monkeypatch.setattr(Session, "commit", lambda self: commits.append(self))
+        resp = c.patch(f"/api/posts/{post.id}?topic=risk-management")
+        assert resp.status_code == 200
+        assert resp.json()["topic"] == "risk-management"
+        assert commits == []
+
+
+# ---------------------------------------------------------------------------
+# API: database export
+# ---------------------------------------------------------------------------
+
+
+class TestExportDbApi:
+    def test_export_returns_consistent_snapshot(self, client, tmp_path):
+        """The downloaded snapshot is a readable copy of the database file."""
+        import sqlite3
+
+        from app.config import settings
+
+        src = sqlite3.connect(str(settings.db_path))
+        src.execute("PRAGMA journal_mode=WAL")
+        src.execute("CREATE TABLE t (v INTEGER)")
+        src.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+        src.commit()
+
+        resp = client.get("/api/export/db")
+        src.close()
+        assert resp.status_code == 200
+
+        out = tmp_path / "downloaded.db"
+        out.write_bytes(resp.content)
+        copy = sqlite3.connect(str(out))
+        assert copy.execute("SELECT count(*), sum(v) FROM t").fetchone() == (100, 4950)
+        copy.close()
+        assert not list(tmp_path.glob("linkedin-export-*.db"))
+
 
 # ---------------------------------------------------------------------------
 # Dashboard: analytics page route